@@ -0,0 +1,132 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi.responses import ORJSONResponse
+from .privacyspy import privacyspy_client
+from . import deadline
+
+MAX_COLD_ANALYSES = int(os.getenv("MAX_COLD_ANALYSES", "8"))
+MAX_INFLIGHT_BYTES = int(os.getenv("MAX_INFLIGHT_BYTES", str(64 * 1024 * 1024)))
+MAX_QUEUED_ANALYSES = int(os.getenv("MAX_QUEUED_ANALYSES", "32"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "5"))
+# Reserved per analysis until the real policy size is known
+ESTIMATED_POLICY_BYTES = int(os.getenv("ESTIMATED_POLICY_BYTES", str(512 * 1024)))
+# "reject": 503 + Retry-After; "degrade": answer from in-memory data only
+OVERLOAD_MODE = os.getenv("OVERLOAD_MODE", "reject").strip().lower()
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "5"))
+
+class Overloaded(Exception):
+    pass
+
+class Ticket:
+    """One admitted analysis; ``account`` replaces the byte estimate with the real size."""
+
+    def __init__(self, controller: "AdmissionController", reserved: int):
+        self.controller = controller
+        self.bytes = reserved
+
+    def account(self, actual_bytes: int) -> None:
+        self.controller.inflight_bytes += actual_bytes - self.bytes
+        self.bytes = actual_bytes
+
+class AdmissionController:
+    """Bounds concurrent cold analyses and the policy bytes they hold in memory,
+    with a bounded FIFO wait queue. Cache hits never pass through here.
+    """
+
+    def __init__(self, max_active: int, max_bytes: int, max_queued: int, queue_timeout: float,
+                 estimated_bytes: int):
+        self.max_active = max_active
+        self.max_bytes = max_bytes
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.estimated_bytes = estimated_bytes
+        self.active = 0
+        self.inflight_bytes = 0
+        self.queued = 0
+        self.admitted_total = 0
+        self.shed_total = 0
+        self._cond: asyncio.Condition | None = None
+
+    def _has_room(self) -> bool:
+        # A lone analysis is always admitted, even if it alone exceeds the byte budget
+        if self.active == 0:
+            return True
+        return (self.active < self.max_active
+                and self.inflight_bytes + self.estimated_bytes <= self.max_bytes)
+
+    @asynccontextmanager
+    async def admit(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            if not self._has_room() or self.queued:
+                if self.queued >= self.max_queued:
+                    self.shed_total += 1
+                    raise Overloaded()
+                self.queued += 1
+                try:
+                    # Waiting for a slot spends the request's own budget too
+                    await asyncio.wait_for(self._cond.wait_for(self._has_room),
+                                           deadline.stage_timeout(self.queue_timeout))
+                except asyncio.TimeoutError:
+                    self.shed_total += 1
+                    raise Overloaded()
+                finally:
+                    self.queued -= 1
+            self.active += 1
+            self.admitted_total += 1
+            self.inflight_bytes += self.estimated_bytes
+        ticket = Ticket(self, self.estimated_bytes)
+        try:
+            yield ticket
+        finally:
+            async with self._cond:
+                self.active -= 1
+                self.inflight_bytes -= ticket.bytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "inflight_bytes": self.inflight_bytes,
+            "admitted_total": self.admitted_total,
+            "shed_total": self.shed_total,
+        }
+
+admission = AdmissionController(MAX_COLD_ANALYSES, MAX_INFLIGHT_BYTES, MAX_QUEUED_ANALYSES,
+                                QUEUE_TIMEOUT_SECONDS, ESTIMATED_POLICY_BYTES)
+
+def overloaded_response(domain: str) -> ORJSONResponse:
+    """503 with Retry-After, or (OVERLOAD_MODE=degrade) a 200 built only from data
+    already in memory: no fetch, no parse, no AI, nothing persisted.
+    """
+    headers = {"Retry-After": str(RETRY_AFTER_SECONDS), "Cache-Control": "no-store"}
+    if OVERLOAD_MODE != "degrade":
+        return ORJSONResponse(
+            {"detail": "Server busy analyzing other sites, please retry shortly."},
+            status_code=503, headers=headers,
+        )
+
+    product = privacyspy_client.peek_product(domain)
+    score = privacyspy_client.convert_privacyspy_score_to_risk(product.get("score") if product else None)
+    return ORJSONResponse({
+        "domain": domain,
+        "source_url": f"https://{domain}/privacy",
+        "summary": {
+            "data_collected": [],
+            "purposes": [],
+            "sharing": "unspecified",
+            "retention": "unspecified",
+            "user_rights": None
+        },
+        "risk_score": score,
+        "enhanced_insights": {
+            "data_source": "degraded",
+            "degraded": True,
+            "privacyspy_available": product is not None,
+            "privacyspy_score": product.get("score") if product else None,
+            "note": "Server busy: quick estimate without reading the policy. Retry for a full analysis."
+        }
+    }, headers=headers)
@@ -0,0 +1,130 @@
+from .models import Summary
+from .extract import html_to_text
+from .scoring import risk_score, KEYWORDS, SAFE
+from .risk_model import model_risk_score
+
+DATA_KEYWORDS = [
+    "email", "name", "phone", "location", "ip", "device", "cookie", "biometric", "payment",
+    "address", "age", "gender", "birth", "ssn", "social security", "credit card", "bank",
+    "financial", "health", "medical", "genetic", "dna", "sexual", "political", "religious",
+    "browsing history", "search history", "purchase history", "device id", "fingerprint"
+]
+
+PURPOSE_KEYWORDS = [
+    "ads", "advertising", "analytics", "personalization", "research", "improve services",
+    "security", "marketing", "profiling", "behavioral", "targeted", "recommendations",
+    "customer service", "support", "legal", "compliance", "fraud prevention"
+]
+
+RIGHTS_KEYWORDS = [
+    "access", "delete", "portability", "opt-out", "opt out", "do not sell", "limit use",
+    "correct", "update", "withdraw", "consent", "unsubscribe", "right to be forgotten",
+    "data portability", "rectification", "erasure", "restriction", "objection"
+]
+
+SHARING_TERMS = ["sell", "advertis", "share", "third party", "partner"]
+NOT_SOLD_TERMS = ["do not sell", "no sale", "no sharing"]
+NOT_SHARED_TERMS = ["no third party", "no sharing", "internal only"]
+RETENTION_TERMS = [
+    "indefinite", "permanent", "30 days", "1 month", "90 days", "3 months",
+    "12 months", "1 year", "24 months", "2 years", "delete", "30", "60", "90"
+]
+
+# Every term the heuristics look at; counts over these are additive across sections
+HEURISTIC_TERMS = tuple(dict.fromkeys(
+    DATA_KEYWORDS + PURPOSE_KEYWORDS + RIGHTS_KEYWORDS + SHARING_TERMS + NOT_SOLD_TERMS
+    + NOT_SHARED_TERMS + RETENTION_TERMS + list(KEYWORDS) + list(SAFE)
+))
+
+def term_counts(text_content: str) -> dict[str, int]:
+    """Occurrence counts of every heuristic term (zero counts omitted)."""
+    t = text_content.lower()
+    counts = {}
+    for k in HEURISTIC_TERMS:
+        c = t.count(k)
+        if c:
+            counts[k] = c
+    return counts
+
+def heuristic_summary(text_content: str) -> Summary:
+    """Keyword-based summary used when no AI summary is available."""
+    t = text_content.lower()
+    return summary_from_terms(lambda k: k in t)
+
+def summary_from_counts(counts: dict[str, int]) -> Summary:
+    """Same as heuristic_summary, from (possibly merged) term_counts output."""
+    return summary_from_terms(lambda k: counts.get(k, 0) > 0)
+
+def summary_from_terms(has) -> Summary:
+    # More comprehensive data collection detection
+    data_collected = [k for k in DATA_KEYWORDS if has(k)]
+
+    # More comprehensive purposes detection
+    purposes = [k for k in PURPOSE_KEYWORDS if has(k)]
+
+    # Enhanced sharing detection
+    sharing = "limited/unspecified"
+    if any(has(word) for word in SHARING_TERMS):
+        if any(has(word) for word in NOT_SOLD_TERMS):
+            sharing = "not sold/shared"
+        else:
+            sharing = "sold/shared with advertisers/partners"
+    elif any(has(word) for word in NOT_SHARED_TERMS):
+        sharing = "not shared with third parties"
+
+    # Enhanced retention detection
+    retention = "unspecified"
+    if has("indefinite") or has("permanent"):
+        retention = "indefinite"
+    elif has("30 days") or has("1 month"):
+        retention = "30 days"
+    elif has("90 days") or has("3 months"):
+        retention = "90 days"
+    elif has("12 months") or has("1 year"):
+        retention = "12 months"
+    elif has("24 months") or has("2 years"):
+        retention = "24 months"
+    elif has("delete") and (has("30") or has("60") or has("90")):
+        retention = "automatic deletion"
+
+    # Enhanced user rights detection
+    rights = [k for k in RIGHTS_KEYWORDS if has(k)]
+    user_rights = ", ".join(sorted(set(rights))) or None
+
+    return Summary(
+        data_collected=sorted(set(data_collected)),
+        purposes=purposes,
+        sharing=sharing,
+        retention=retention,
+        user_rights=user_rights
+    )
+
+def analyze_documents(pages: list[tuple[str, str]]) -> dict:
+    """CPU-bound part of the pipeline for ``(url, html)`` pages of one domain:
+    readability extraction, the same document merge and section dedupe as
+    /summarize, heuristic summary and scores. Top-level and dict-returning so it
+    can run in a process pool.
+    """
+    from .extract import merge_documents
+    from .sections import split_sections, merge_counts
+    from .scoring import risk_score_from_counts
+    texts = []
+    for url, html in pages:
+        try:
+            texts.append(html_to_text(html) if html else "")
+        except Exception as e:
+            print(f"Error extracting {url}: {e}")
+            texts.append("")
+    docs = merge_documents([u for u, _ in pages], [h for _, h in pages], texts)
+    text_content = "\n\n".join(d["text"] for d in docs)
+    sections = split_sections(text_content)
+    for s in sections:
+        s["counts"] = term_counts(s["text"])
+    counts = merge_counts(sections)
+    return {
+        "documents": [d["url"] for d in docs],
+        "text_length": len(text_content),
+        "summary": summary_from_counts(counts).model_dump(),
+        "heuristic_score": risk_score_from_counts(counts),
+        "model_score": model_risk_score(text_content),
+    }
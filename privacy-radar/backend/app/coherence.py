@@ -0,0 +1,78 @@
+import asyncio
+import json
+import uuid
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from .db import DATABASE_URL
+
+CHANNEL = "site_summary"
+# Postgres caps NOTIFY payloads at 8000 bytes; optional fields that don't fit are left out,
+# and a body that doesn't fit goes out as an invalidation
+MAX_PAYLOAD_BYTES = 7500
+WORKER_ID = uuid.uuid4().hex[:12]
+
+_subscribers = []
+
+def subscribe(callback):
+    """Register ``callback(event)`` for every site_summary event, including this worker's own."""
+    _subscribers.append(callback)
+    return callback
+
+def publish(conn, domain: str, body: bytes | None = None, privacyspy: dict | None = None, **fields) -> None:
+    """Queue a site_summary event on ``conn``'s transaction.
+
+    Postgres delivers it to every listener only when the transaction commits,
+    so listeners never see a write that was rolled back. ``privacyspy`` is the
+    product data the write was scored with, so other workers can warm their cache.
+    """
+    event = {"event": "update", "domain": domain, "origin": WORKER_ID, **fields}
+    if body is not None:
+        event["body"] = body.decode()
+    if privacyspy is not None:
+        event["privacyspy"] = privacyspy
+    payload = json.dumps(event)
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES and "privacyspy" in event:
+        event.pop("privacyspy")
+        payload = json.dumps(event)
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        event.pop("body", None)
+        event["event"] = "invalidate"
+        payload = json.dumps(event)
+    conn.execute(text("SELECT pg_notify(:c, :p)"), {"c": CHANNEL, "p": payload})
+
+def publish_resync(conn) -> None:
+    """Make every worker drop its cached copies and reload, e.g. after a bulk import."""
+    conn.execute(text("SELECT pg_notify(:c, :p)"),
+                 {"c": CHANNEL, "p": json.dumps({"event": "resync", "origin": WORKER_ID})})
+
+def dispatch(event: dict) -> None:
+    for callback in _subscribers:
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"Warning: cache event handler failed: {e}")
+
+async def listen(reconnect_delay: float = 2.0) -> None:
+    """LISTEN on the site_summary channel forever, reconnecting on failure.
+
+    After every (re)connect a ``resync`` event is dispatched, since anything
+    published while disconnected was missed.
+    """
+    dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {CHANNEL}")
+                dispatch({"event": "resync", "origin": None})
+                async for notify in conn.notifies():
+                    try:
+                        event = json.loads(notify.payload)
+                    except ValueError:
+                        continue
+                    dispatch(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Warning: cache event listener disconnected: {e}")
+        await asyncio.sleep(reconnect_delay)
@@ -24,6 +24,17 @@ def init_db(max_retries: int = 20, delay_seconds: float = 1.5) -> None:
                       risk_score REAL,
                       updated_at TIMESTAMP DEFAULT NOW()
                     );
+                    ALTER TABLE site_summary ADD COLUMN IF NOT EXISTS response_body BYTEA;
+                    CREATE TABLE IF NOT EXISTS site_section (
+                      domain TEXT NOT NULL,
+                      section_hash TEXT NOT NULL,
+                      position INTEGER,
+                      title TEXT,
+                      counts JSONB,
+                      ai_findings JSONB,
+                      updated_at TIMESTAMP DEFAULT NOW(),
+                      PRIMARY KEY (domain, section_hash)
+                    );
                     """
                 ))
             return
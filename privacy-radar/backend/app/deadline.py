@@ -0,0 +1,80 @@
+import os
+import time
+import asyncio
+from contextvars import ContextVar
+
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))
+MAX_DEADLINE_SECONDS = float(os.getenv("MAX_REQUEST_DEADLINE_SECONDS", "60"))
+# Optional stages aren't started with less budget than this left
+MIN_STAGE_SECONDS = float(os.getenv("MIN_STAGE_SECONDS", "0.5"))
+DEADLINE_HEADER = "X-Request-Deadline"
+
+class Deadline:
+    """Time budget of one request, shared by every stage it runs (including tasks it spawns)."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.skipped: list[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+_current: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+def start(seconds: float | None = None) -> Deadline:
+    """Start the deadline for the current request: the client's budget (header value,
+    clamped to MAX_DEADLINE_SECONDS) or the server default.
+    """
+    if seconds is None or seconds <= 0:
+        seconds = DEFAULT_DEADLINE_SECONDS
+    deadline = Deadline(min(seconds, MAX_DEADLINE_SECONDS))
+    _current.set(deadline)
+    return deadline
+
+def clear() -> None:
+    """Drop the deadline from the current context, e.g. for work several requests share."""
+    _current.set(None)
+
+def current() -> Deadline | None:
+    return _current.get()
+
+def remaining() -> float | None:
+    """Seconds left, or None outside a request (CLI tools run without a deadline)."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+def stage_timeout(cap: float) -> float:
+    """Timeout for a stage: its usual cap, shortened to what is left of the budget."""
+    left = remaining()
+    return cap if left is None else min(cap, left)
+
+async def bounded(stage: str, aw, cap: float | None = None):
+    """Await ``aw`` for at most the rest of the budget (and ``cap``).
+
+    Client timeouts such as httpx's apply per connect/read step, so a slow
+    trickle can outlive them; this caps the stage as a whole. A stage cut off
+    by the deadline is recorded as skipped and raises TimeoutError.
+    """
+    deadline = _current.get()
+    limit = cap if deadline is None else deadline.remaining() if cap is None else min(cap, deadline.remaining())
+    if limit is None:
+        return await aw
+    try:
+        return await asyncio.wait_for(aw, limit)
+    except asyncio.TimeoutError:
+        if deadline is not None and deadline.remaining() <= 0 and stage not in deadline.skipped:
+            deadline.skipped.append(stage)
+        raise
+
+def allow(stage: str, min_seconds: float = MIN_STAGE_SECONDS) -> bool:
+    """Whether an optional stage still fits; records it as skipped if not."""
+    deadline = _current.get()
+    if deadline is None or deadline.remaining() >= min_seconds:
+        return True
+    if stage not in deadline.skipped:
+        deadline.skipped.append(stage)
+    return False
+
+def skipped_stages() -> list[str]:
+    deadline = _current.get()
+    return list(deadline.skipped) if deadline else []
@@ -1,32 +1,131 @@
-import httpx, re
-from bs4 import BeautifulSoup
-from readability import Document
+import os
+import re
+import asyncio
+import hashlib
+from typing import TYPE_CHECKING
+from . import deadline
+
+if TYPE_CHECKING:
+    import httpx
+
+# httpx, readability (lxml) and BeautifulSoup are imported on first use so that
+# importing the app, and with it the first /health, doesn't pay for them.
+
+# Documents analyzed together per domain (privacy, cookie and terms pages)
+MAX_POLICY_DOCS = int(os.getenv("MAX_POLICY_DOCS", "3"))
+# Concurrent connections one analysis opens while fetching them
+PER_DOMAIN_CONNECTIONS = int(os.getenv("PER_DOMAIN_CONNECTIONS", "2"))
 
 CAND_PAT = re.compile(r"(privacy|policy|terms|cookie)", re.I)
 
-def pick_best_url(domain: str, candidates: list[str]) -> str | None:
-    uniq = list(dict.fromkeys(candidates))
+def rank_urls(domain: str, candidates: list[str]) -> list[str]:
+    uniq = list(dict.fromkeys(u.split("#")[0] for u in candidates if u))
     if not uniq:
         # fallback guess
-        return f"https://{domain}/privacy"  # may 404; backend will handle
-    ranked = sorted(uniq, key=lambda u: (
+        return [f"https://{domain}/privacy"]  # may 404; backend will handle
+    return sorted(uniq, key=lambda u: (
         0 if re.search(r"privacy|policy", u, re.I) else 1,
         0 if re.search(r"terms", u, re.I) else 1,
         len(u)
     ))
-    return ranked[0]
 
-async def fetch_text(url: str) -> tuple[str, str]:
+def pick_best_url(domain: str, candidates: list[str]) -> str | None:
+    return rank_urls(domain, candidates)[0]
+
+def _doc_kind(url: str) -> str:
+    if re.search(r"cookie", url, re.I):
+        return "cookie"
+    if re.search(r"privacy|policy", url, re.I):
+        return "privacy"
+    if re.search(r"terms|legal", url, re.I):
+        return "terms"
+    return "other"
+
+def pick_policy_urls(domain: str, candidates: list[str], limit: int = MAX_POLICY_DOCS) -> list[str]:
+    """Up to ``limit`` URLs, best first, preferring one of each kind of document
+    (privacy, cookie, terms) over several variants of the same page.
+    """
+    ranked = rank_urls(domain, candidates)
+    by_kind: dict[str, str] = {}
+    for url in ranked:
+        by_kind.setdefault(_doc_kind(url), url)
+    picked = list(by_kind.values())[:limit]
+    picked += [u for u in ranked if u not in picked][:limit - len(picked)]
+    return picked
+
+def html_to_text(html: str) -> str:
+    """Readable text of a policy page (CPU-bound: readability + BeautifulSoup)."""
+    from bs4 import BeautifulSoup
+    from readability import Document
+    doc = Document(html)
+    readable_html = doc.summary()
+    soup = BeautifulSoup(readable_html, "html.parser")
+    return soup.get_text(separator="\n", strip=True)
+
+async def fetch_html(url: str, client: "httpx.AsyncClient | None" = None) -> str:
+    """Fetch raw HTML, reusing ``client`` when given. Returns "" on failure."""
+    import httpx
+    if not deadline.allow("fetch", min_seconds=0.1):
+        return ""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=15) as client:
-            r = await client.get(url)
+        if client is not None:
+            timeout = deadline.stage_timeout(15) if deadline.current() else httpx.USE_CLIENT_DEFAULT
+            r = await deadline.bounded("fetch", client.get(url, timeout=timeout))
+            r.raise_for_status()
+            return r.text
+        async with httpx.AsyncClient(follow_redirects=True, timeout=deadline.stage_timeout(15)) as client:
+            r = await deadline.bounded("fetch", client.get(url))
             r.raise_for_status()
-            html = r.text
-            doc = Document(html)
-            readable_html = doc.summary()
-            soup = BeautifulSoup(readable_html, "html.parser")
-            text = soup.get_text(separator="\n", strip=True)
-            return (html, text)
+            return r.text
     except Exception as e:
         print(f"Error fetching {url}: {e}")
+        return ""
+
+async def _extract(url: str, html: str) -> str:
+    if not html:
+        return ""
+    try:
+        return await asyncio.to_thread(html_to_text, html)
+    except Exception as e:
+        print(f"Error extracting {url}: {e}")
+        return ""
+
+async def fetch_documents(domain: str, candidates: list[str], limit: int = MAX_POLICY_DOCS) -> list[dict]:
+    """Fetch and extract the top ``limit`` policy documents of a domain concurrently.
+
+    Returns ``[{"url", "html_length", "text"}]`` best first, without failed
+    fetches and without documents whose text repeats an earlier one (e.g. the
+    same page under www. and the bare domain).
+    """
+    import httpx
+    urls = pick_policy_urls(domain, candidates, limit)
+    limits = httpx.Limits(max_connections=PER_DOMAIN_CONNECTIONS,
+                          max_keepalive_connections=PER_DOMAIN_CONNECTIONS)
+    async with httpx.AsyncClient(follow_redirects=True, timeout=deadline.stage_timeout(15),
+                                 limits=limits) as client:
+        htmls = await asyncio.gather(*(fetch_html(u, client) for u in urls))
+    texts = await asyncio.gather(*(_extract(u, h) for u, h in zip(urls, htmls)))
+    return merge_documents(urls, htmls, texts)
+
+def merge_documents(urls: list[str], htmls: list[str], texts: list[str]) -> list[dict]:
+    """``fetch_documents``' result from already fetched and extracted pages."""
+    docs, seen = [], set()
+    for url, html, text in zip(urls, htmls, texts):
+        if not text.strip():
+            continue
+        digest = hashlib.sha256(" ".join(text.lower().split()).encode()).hexdigest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        docs.append({"url": url, "html_length": len(html), "text": text})
+    return docs
+
+async def fetch_text(url: str) -> tuple[str, str]:
+    html = await fetch_html(url)
+    if not html:
+        return ("", "")
+    try:
+        return (html, html_to_text(html))
+    except Exception as e:
+        print(f"Error extracting {url}: {e}")
         return ("", "")
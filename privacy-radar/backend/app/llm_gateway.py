@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import heapq
+import itertools
+import contextvars
+from collections import deque
+from typing import Any, Awaitable, Callable
+from . import deadline
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "").strip().rstrip("/")
+# One model for every caller, kept loaded between calls, so Ollama never swaps models
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Match OLLAMA_NUM_PARALLEL on the Ollama server; anything above it only queues there
+LLM_OLLAMA_CONCURRENCY = int(os.getenv("LLM_OLLAMA_CONCURRENCY", "1"))
+LLM_OPENAI_CONCURRENCY = int(os.getenv("LLM_OPENAI_CONCURRENCY", "16"))
+LLM_MAX_QUEUED = int(os.getenv("LLM_MAX_QUEUED", "256"))
+# When the first provider hasn't answered after this long, ask the next one too:
+# seconds, or a percentile of the first provider's recent latency ("p90")
+LLM_HEDGE_DELAY = os.getenv("LLM_HEDGE_DELAY", "p90").strip().lower()
+# Used while there are too few latency samples for a percentile
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4"))
+# Share of recent calls allowed to hedge, so slow spells don't double LLM cost
+LLM_MAX_HEDGE_RATE = float(os.getenv("LLM_MAX_HEDGE_RATE", "0.2"))
+
+# Lower runs first. Calls made outside a request (CLI tools, warm-up) are background.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+class QueueFull(Exception):
+    pass
+
+class _Call:
+    """One queued provider call, shared by every caller that submitted the same key."""
+
+    def __init__(self, key: str, fn: Callable[[], Awaitable[Any]], context: contextvars.Context):
+        self.key = key
+        self.fn = fn
+        self.context = context
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+        self.task: asyncio.Task | None = None
+        self.enqueued_at = time.monotonic()
+
+class Provider:
+    """Concurrency-capped priority queue in front of one LLM backend.
+
+    Neither Ollama's /api/generate nor chat completions take several prompts in
+    one call, so queued prompts are batched by coalescing: callers submitting
+    the same prompt while it is queued or running share a single call.
+    """
+
+    def __init__(self, name: str, limit: int, max_queued: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queued = max_queued
+        self.active = 0
+        self._heap: list[tuple[int, int, _Call]] = []
+        self._seq = itertools.count()
+        self._calls: dict[str, _Call] = {}
+        self.calls_total = 0
+        self.coalesced_total = 0
+        self.errors_total = 0
+        self.dropped_total = 0
+        self.queue_waits = deque(maxlen=256)
+        self.latencies = deque(maxlen=256)
+
+    async def submit(self, key: str, fn: Callable[[], Awaitable[Any]], priority: int) -> Any:
+        # Interactive and background callers never share a call, so neither sets the other's place in line
+        key = f"{priority}:{key}"
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced_total += 1
+        else:
+            if len(self._heap) >= self.max_queued:
+                self.dropped_total += 1
+                raise QueueFull(f"{self.name} queue full")
+            # The call may be shared, so it runs without the first submitter's deadline;
+            # each caller waits for it only as long as its own budget allows
+            context = contextvars.copy_context()
+            context.run(deadline.clear)
+            call = _Call(key, fn, context)
+            self._calls[key] = call
+            heapq.heappush(self._heap, (priority, next(self._seq), call))
+            self._pump()
+        call.waiters += 1
+        try:
+            return await deadline.bounded(self.name, asyncio.shield(call.future))
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            call.waiters -= 1
+            if call.waiters == 0:
+                self._abandon(call)
+            raise
+
+    def _abandon(self, call: _Call) -> None:
+        # Nobody is waiting any more: free the slot (or queue position) for someone who is
+        if self._calls.get(call.key) is call:
+            del self._calls[call.key]
+        if call.task is not None:
+            call.task.cancel()
+        else:
+            call.future.cancel()
+
+    def _pump(self) -> None:
+        while self.active < self.limit and self._heap:
+            _, _, call = heapq.heappop(self._heap)
+            if call.future.done():
+                continue  # abandoned while queued
+            self.active += 1
+            call.task = asyncio.create_task(self._run(call), context=call.context)
+
+    async def _run(self, call: _Call) -> None:
+        started = time.monotonic()
+        self.queue_waits.append(started - call.enqueued_at)
+        self.calls_total += 1
+        try:
+            result = await call.fn()
+            # Only completed calls count, so cancelled hedge losers don't skew the percentiles
+            self.latencies.append(time.monotonic() - started)
+            if not call.future.done():
+                call.future.set_result(result)
+        except asyncio.CancelledError:
+            call.future.cancel()
+        except Exception as e:
+            self.errors_total += 1
+            if not call.future.done():
+                call.future.set_exception(e)
+        finally:
+            self.active -= 1
+            if self._calls.get(call.key) is call:
+                del self._calls[call.key]
+            self._pump()
+        # Retrieved here so an unawaited failure isn't reported as "never retrieved"
+        if not call.future.cancelled():
+            call.future.exception()
+
+    def latency_percentile(self, p: float) -> float | None:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": sum(1 for _, _, c in self._heap if not c.future.done()),
+            "calls_total": self.calls_total,
+            "coalesced_total": self.coalesced_total,
+            "errors_total": self.errors_total,
+            "dropped_total": self.dropped_total,
+            "queue_wait_ms": _percentiles(self.queue_waits),
+            "latency_ms": _percentiles(self.latencies),
+        }
+
+def _percentiles(samples: deque) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+    return {"p50": pick(0.50), "p95": pick(0.95)}
+
+providers = {
+    "ollama": Provider("ollama", LLM_OLLAMA_CONCURRENCY, LLM_MAX_QUEUED),
+    "openai": Provider("openai", LLM_OPENAI_CONCURRENCY, LLM_MAX_QUEUED),
+}
+
+def prompt_key(*parts: str) -> str:
+    return hashlib.sha1("\x00".join(parts).encode("utf-8")).hexdigest()
+
+async def submit(provider: str, key: str, fn: Callable[[], Awaitable[Any]], priority: int | None = None) -> Any:
+    """Run ``fn`` through ``provider``'s queue; ``key`` identifies identical calls.
+    ``fn`` runs without a request deadline, since callers with different budgets
+    may share it; each caller's own deadline bounds its wait, queueing included.
+    """
+    if priority is None:
+        priority = INTERACTIVE if deadline.current() is not None else BACKGROUND
+    return await providers[provider].submit(key, fn, priority)
+
+def ollama_attempt(prompt: str, timeout_cap: float) -> tuple[str, str, Callable[[], Awaitable[str]]]:
+    """Non-streaming /api/generate on the pinned model, as a ``(provider, key, fn)`` attempt."""
+    async def call() -> str:
+        import httpx
+        payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": False,
+                   "keep_alive": OLLAMA_KEEP_ALIVE}
+        async with httpx.AsyncClient(timeout=deadline.stage_timeout(timeout_cap)) as client:
+            r = await client.post(f"{OLLAMA_HOST}/api/generate", json=payload)
+            r.raise_for_status()
+            return r.json().get("response", "")
+
+    return ("ollama", prompt_key(OLLAMA_MODEL, prompt), call)
+
+async def ollama_generate(prompt: str, timeout_cap: float, priority: int | None = None) -> str:
+    """Returns the response text."""
+    provider, key, call = ollama_attempt(prompt, timeout_cap)
+    return await submit(provider, key, call, priority)
+
+def json_object(text: str) -> dict:
+    """The JSON object in an LLM reply (code fences and chatter around it are ignored)."""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("no JSON object in LLM response")
+    data = json.loads(text[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("LLM response is not a JSON object")
+    return data
+
+class HedgeStats:
+    def __init__(self):
+        self.calls_total = 0
+        self.hedged_total = 0
+        self.fallback_total = 0
+        self.budget_skipped_total = 0
+        self.wins: dict[str, int] = {}
+        self.recent = deque(maxlen=200)  # whether each recent call hedged
+
+    def may_hedge(self) -> bool:
+        return sum(self.recent) < LLM_MAX_HEDGE_RATE * max(len(self.recent), 1)
+
+    def stats(self) -> dict:
+        return {
+            "calls_total": self.calls_total,
+            "hedged_total": self.hedged_total,
+            "fallback_total": self.fallback_total,
+            "budget_skipped_total": self.budget_skipped_total,
+            "hedge_rate": round(sum(self.recent) / len(self.recent), 3) if self.recent else 0.0,
+            "wins": dict(self.wins),
+        }
+
+hedge_stats = HedgeStats()
+
+def hedge_delay(provider: str) -> float:
+    if not LLM_HEDGE_DELAY.startswith("p"):
+        return float(LLM_HEDGE_DELAY)
+    observed = providers[provider].latency_percentile(float(LLM_HEDGE_DELAY[1:]) / 100)
+    return LLM_HEDGE_DEFAULT_DELAY if observed is None else observed
+
+async def hedged(attempts: list[tuple[str, str, Callable[[], Awaitable[Any]]]],
+                 parse: Callable[[Any], Any]) -> Any:
+    """Run ``(provider, key, fn)`` attempts in order of preference; the first
+    response that ``parse`` accepts wins and the others are cancelled.
+
+    The next attempt starts when the running ones have all failed (fallback), or
+    when none has answered within ``hedge_delay`` of the first provider (hedge,
+    limited to LLM_MAX_HEDGE_RATE of recent calls).
+    """
+    async def run(attempt):
+        provider, key, fn = attempt
+        return parse(await submit(provider, key, fn))
+
+    hedge_stats.calls_total += 1
+    delay = hedge_delay(attempts[0][0])
+    allow_hedge = len(attempts) > 1 and hedge_stats.may_hedge()
+    if len(attempts) > 1 and not allow_hedge:
+        hedge_stats.budget_skipped_total += 1
+    running: dict[asyncio.Task, str] = {asyncio.create_task(run(attempts[0])): attempts[0][0]}
+    next_attempt = 1
+    did_hedge = False
+    last_error: Exception | None = None
+    try:
+        while running:
+            can_hedge = allow_hedge and not did_hedge and next_attempt < len(attempts)
+            done, _ = await asyncio.wait(running, timeout=delay if can_hedge else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                provider = running.pop(task)
+                if task.exception() is None:
+                    hedge_stats.wins[provider] = hedge_stats.wins.get(provider, 0) + 1
+                    return task.result()
+                last_error = task.exception()
+            if next_attempt < len(attempts) and (not running or not done):
+                if done:
+                    hedge_stats.fallback_total += 1
+                else:
+                    hedge_stats.hedged_total += 1
+                    did_hedge = True
+                attempt = attempts[next_attempt]
+                running[asyncio.create_task(run(attempt))] = attempt[0]
+                next_attempt += 1
+        raise last_error or RuntimeError("no LLM provider answered")
+    finally:
+        hedge_stats.recent.append(did_hedge)
+        for task in running:
+            task.cancel()
+
+async def preload_ollama() -> None:
+    """Load the pinned model ahead of the first request (a generate without a prompt)."""
+    import httpx
+    async with httpx.AsyncClient(timeout=120) as client:
+        r = await client.post(f"{OLLAMA_HOST}/api/generate",
+                              json={"model": OLLAMA_MODEL, "keep_alive": OLLAMA_KEEP_ALIVE})
+        r.raise_for_status()
+
+def stats() -> dict:
+    return dict({name: p.stats() for name, p in providers.items()}, hedging=hedge_stats.stats())
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "1").strip() not in ("0", "false", "")
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+# Lag above this counts as a stall (and, in debug mode, gets a stack sample)
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1"))
+LOOP_MONITOR_DEBUG = os.getenv("LOOP_MONITOR_DEBUG", "").strip().lower() in ("1", "true", "yes")
+
+class LoopMonitor:
+    """Measures event-loop lag: how late a periodic ``sleep`` wakes up.
+
+    Anything that runs on the loop without yielding (sync DB calls, parsing,
+    CPU-bound loops) shows up as lag. In debug mode a watchdog thread also
+    prints the loop thread's stack while it is blocked, once per stall.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = deque(maxlen=600)  # last minute at the default interval
+        self.max_lag = 0.0
+        self.stalls_total = 0
+        self.heartbeat = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self._loop_thread_id: int | None = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.heartbeat = now
+            lag = max(0.0, now - expected)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.stalls_total += 1
+
+    def _watchdog(self) -> None:
+        reported = None
+        while True:
+            time.sleep(self.threshold / 2)
+            stalled_for = time.monotonic() - self.heartbeat - self.interval
+            if stalled_for < self.threshold:
+                reported = None
+                continue
+            if reported == self.heartbeat:
+                continue
+            reported = self.heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                stack = "".join(traceback.format_stack(frame))
+                print(f"Warning: event loop blocked for {stalled_for * 1000:.0f} ms at:\n{stack}")
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        if LOOP_MONITOR_DEBUG:
+            threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        if not self.samples:
+            return {"lag_ms": None}
+        ordered = sorted(self.samples)
+
+        def pick(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+        return {
+            "lag_ms": {"current": round(self.samples[-1] * 1000, 1), "p50": pick(0.50),
+                       "p99": pick(0.99), "max": round(self.max_lag * 1000, 1)},
+            "stalls_total": self.stalls_total,
+        }
+
+loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL, LOOP_BLOCK_THRESHOLD)
+
+def start() -> None:
+    """Start measuring lag on the running loop if enabled (call from a startup hook)."""
+    if LOOP_MONITOR:
+        loop_monitor.start()
@@ -1,35 +1,141 @@
-import os, json
+import os
 import asyncio
-from fastapi import FastAPI, HTTPException
+import hashlib
+import time
+import orjson
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import FastAPI, HTTPException, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import text
-from .models import SummarizeRequest, SummarizeResponse, Summary
+from .models import SummarizeRequest, SummarizeResponse
 from .db import engine, init_db
-from .extract import pick_best_url, fetch_text
-from .scoring import risk_score, enhanced_risk_score
-from .privacyspy import enhanced_risk_score_with_privacyspy
+from .extract import pick_best_url, fetch_documents
+from .analysis import summary_from_counts
+from .sections import split_sections, load_sections, reuse_sections, merge_counts, merge_ai_findings
+from .scoring import risk_score_from_counts
+from .privacyspy import enhanced_risk_score_with_privacyspy, privacyspy_client
+from .coherence import subscribe, listen, WORKER_ID
+from .warmup import schedule_warm_up
+from .admission import admission, Overloaded, Ticket, overloaded_response
+from . import deadline, profiling, llm_gateway, loop_monitor
+from .score_table import score_table, load_score_rows
+from .write_behind import write_buffer, PendingWrite
 
 CORS_ORIGIN = os.getenv("CORS_ORIGIN", "*")
 CACHE_TTL_DAYS = int(os.getenv("CACHE_TTL_DAYS", "14"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "").strip()
+SITE_CACHE_MAX_AGE = int(os.getenv("SITE_CACHE_MAX_AGE", "3600"))
+LOCAL_CACHE_SIZE = int(os.getenv("LOCAL_CACHE_SIZE", "10000"))
+MAX_SCORE_DOMAINS = int(os.getenv("MAX_SCORE_DOMAINS", "100"))
+SCORES_CACHE_MAX_AGE = int(os.getenv("SCORES_CACHE_MAX_AGE", "300"))
+AI_SUMMARY_MAX_CHARS = 120000
+SUMMARY_KEYS = ("data_collected", "purposes", "sharing", "retention", "user_rights")
 
-app = FastAPI(title="Privacy Radar API")
+app = FastAPI(title="Privacy Radar API", default_response_class=ORJSONResponse)
+
+app.include_router(profiling.router)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[CORS_ORIGIN, "http://localhost:3000"],
-    allow_methods=["*"], allow_headers=["*"]
+    allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Cache-Control", "X-Profile-Url"]
 )
 
+# Per-worker hot cache of pre-serialized hit bodies: domain -> (body, expires_at epoch).
+# Kept coherent across workers by site_summary LISTEN/NOTIFY events.
+local_cache: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+db_ready = asyncio.Event()
+_listener_task: asyncio.Task | None = None
+
+def _local_get(domain: str) -> bytes | None:
+    entry = local_cache.get(domain)
+    if entry is None:
+        return None
+    body, expires_at = entry
+    if expires_at < time.time():
+        local_cache.pop(domain, None)
+        return None
+    local_cache.move_to_end(domain)
+    return body
+
+def _local_put(domain: str, body: bytes, expires_at: float) -> None:
+    local_cache[domain] = (body, expires_at)
+    local_cache.move_to_end(domain)
+    while len(local_cache) > LOCAL_CACHE_SIZE:
+        local_cache.popitem(last=False)
+
+@subscribe
+def _apply_site_event(event: dict) -> None:
+    kind = event.get("event")
+    if "risk_score" in event:
+        score_table.upsert(event["domain"], event["risk_score"], event["updated_at"])
+    if kind == "resync":
+        local_cache.clear()
+        if db_ready.is_set():
+            asyncio.get_running_loop().create_task(_load_score_table())
+    elif kind == "update" and "body" in event:
+        _local_put(event["domain"], event["body"].encode(), event["expires_at"])
+    elif kind in ("update", "invalidate"):
+        local_cache.pop(event["domain"], None)
+
+@subscribe
+def _apply_privacyspy_event(event: dict) -> None:
+    # Our own writes were made with the PrivacySpy data we already hold
+    if event.get("origin") != WORKER_ID:
+        privacyspy_client.apply_event(event)
+
+
+async def _init_db_in_background():
+    # init_db retries for up to ~30s while Postgres boots; don't hold the port closed for it
+    try:
+        await asyncio.to_thread(init_db)
+        db_ready.set()
+    except Exception as e:
+        print(f"Error: database initialization failed: {e}")
+        return
+    await _load_score_table()
+
+def _read_score_rows():
+    with engine.begin() as conn:
+        return load_score_rows(conn)
+
+async def _load_score_table():
+    try:
+        rows = await asyncio.to_thread(_read_score_rows)
+        score_table.load(rows)
+        print(f"Loaded {len(score_table)} scores into the badge score table")
+    except Exception as e:
+        print(f"Warning: Failed to load score table: {e}")
+
 @app.on_event("startup")
-def _startup():
-    init_db()
+async def _startup():
+    global _listener_task
+    asyncio.create_task(_init_db_in_background())
+    _listener_task = asyncio.create_task(listen())
+    write_buffer.start()
+    loop_monitor.start()
+    schedule_warm_up()
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await write_buffer.close()
+    if _listener_task is not None:
+        _listener_task.cancel()
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "privacy-radar-api"}
+    return {"status": "healthy", "service": "privacy-radar-api",
+            "database": "ready" if db_ready.is_set() else "starting",
+            "admission": admission.stats(),
+            "llm": llm_gateway.stats(),
+            "event_loop": loop_monitor.loop_monitor.stats(),
+            "write_buffer": write_buffer.stats()}
 
 @app.get("/")
 async def root():
@@ -40,31 +146,185 @@ async def root():
         "description": "Analyze website privacy policies and generate risk scores",
         "endpoints": {
             "POST /summarize": "Analyze a domain's privacy policy",
+            "GET /site/{domain}": "Stored analysis for a domain (cacheable)",
+            "GET /scores?domains=a,b": "Badge scores and freshness for stored domains",
             "GET /health": "Health check",
             "GET /docs": "API documentation"
         }
     }
 
-@app.post("/summarize", response_model=SummarizeResponse)
-async def summarize(req: SummarizeRequest):
-    # Validate input
-    if not req.domain or not req.domain.strip():
-        raise HTTPException(400, "Domain is required")
-    
-    # Clean domain
-    domain = req.domain.strip().lower()
+def clean_domain(raw: str) -> str:
+    domain = raw.strip().lower()
     if domain.startswith(('http://', 'https://')):
         from urllib.parse import urlparse
         domain = urlparse(domain).hostname or domain
-    
-    # try cache
+    return domain
+
+def cached_response_body(domain: str, source_url: str, summary: dict, risk_score: float) -> bytes:
+    """Serialize the exact body a cache hit returns, so hits can skip JSON decode,
+    model validation and re-encoding and stream the stored bytes as-is.
+    """
+    return orjson.dumps({
+        "domain": domain,
+        "source_url": source_url,
+        "summary": summary,
+        "risk_score": float(risk_score),
+        "enhanced_insights": {
+            "data_source": "cached",
+            "privacyspy_available": False,
+            "note": "Using cached analysis"
+        }
+    })
+
+def _site_etag(row) -> str:
+    """Strong ETag derived from the stored row and its freshness, so it changes
+    whenever the row is rewritten or the body's ``fresh`` flag flips.
+    """
+    raw = f"{row.domain}|{row.source_url}|{row.risk_score}|{row.updated_at.isoformat()}|{bool(row.fresh)}"
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+def _not_modified(request: Request, etag: str, last_modified, fresh: bool) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    # A row going stale changes the body without changing Last-Modified
+    if if_modified_since and fresh:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+# Plain def: the DB read runs in FastAPI's threadpool, not on the event loop
+@app.get("/site/{domain}", response_model=SummarizeResponse)
+def get_site(domain: str, request: Request, response: Response):
+    """Read-only lookup of a stored analysis. Never fetches or analyzes.
+
+    Responses carry ETag/Last-Modified/Cache-Control so browsers, the
+    extension and a CDN can revalidate with a 304 instead of a full body.
+    """
+    domain = clean_domain(domain)
+    if not domain:
+        raise HTTPException(400, "Domain is required")
+
     with engine.begin() as conn:
-        cached = conn.execute(text(f"""
-          SELECT domain, source_url, summary_json, risk_score,
+        row = conn.execute(text(f"""
+          SELECT domain, source_url, summary_json, risk_score, updated_at,
                  (NOW() - updated_at) < INTERVAL '{CACHE_TTL_DAYS} days' as fresh
           FROM site_summary WHERE domain=:d
         """), {"d": domain}).fetchone()
+    if not row:
+        raise HTTPException(404, f"No stored analysis for {domain}. Use POST /summarize.")
+
+    etag = _site_etag(row)
+    # updated_at is written with NOW() and stored without a zone; treat it as UTC
+    last_modified = row.updated_at.replace(tzinfo=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        # Stale rows are still served, but clients should come back soon for the refresh
+        "Cache-Control": (
+            f"public, max-age={SITE_CACHE_MAX_AGE}, stale-while-revalidate={SITE_CACHE_MAX_AGE}"
+            if row.fresh else "public, max-age=0, must-revalidate"
+        ),
+        "Vary": "Origin",
+    }
+    if _not_modified(request, etag, last_modified, bool(row.fresh)):
+        return Response(status_code=304, headers=headers)
+
+    # Same shape fresh or stale, so clients can tell from the body when to refresh
+    response.headers.update(headers)
+    return {
+        "domain": row.domain,
+        "source_url": row.source_url,
+        "summary": row.summary_json,
+        "risk_score": float(row.risk_score),
+        "enhanced_insights": {
+            "data_source": "cached",
+            "privacyspy_available": False,
+            "fresh": bool(row.fresh),
+            "updated_at": last_modified.isoformat(),
+            "note": "Using cached analysis"
+        }
+    }
+
+@app.get("/scores")
+async def get_scores(domains: str):
+    """Badge lookup: risk score and freshness for up to MAX_SCORE_DOMAINS
+    comma-separated domains, answered from the in-memory score table only.
+    Unknown domains map to null; use POST /summarize to analyze them.
+    """
+    now = time.time()
+    ttl = CACHE_TTL_DAYS * 86400
+    scores = {}
+    for raw in domains.split(",")[:MAX_SCORE_DOMAINS]:
+        domain = clean_domain(raw)
+        if not domain:
+            continue
+        hit = score_table.get(domain)
+        if hit is None and domain.startswith("www."):
+            hit = score_table.get(domain[4:])
+        scores[domain] = None if hit is None else {
+            "risk_score": round(hit[0], 1),
+            "fresh": now - hit[1] < ttl,
+            "updated_at": int(hit[1]),
+        }
+    # Returned directly: skips jsonable_encoder on the hot badge path
+    return ORJSONResponse(
+        {"scores": scores, "table_loaded": score_table.loaded},
+        headers={"Cache-Control": f"public, max-age={SCORES_CACHE_MAX_AGE}"},
+    )
+
+@app.post("/summarize", response_model=SummarizeResponse)
+async def summarize(req: SummarizeRequest,
+                    x_request_deadline: float | None = Header(default=None),
+                    x_profile: str | None = Header(default=None)):
+    profile = profiling.start(x_profile, req.domain)
+    if profile is None:
+        return await _summarize(req, x_request_deadline)
+    try:
+        result = await _summarize(req, x_request_deadline)
+    finally:
+        url = profile.stop()
+    return profiling.attach(result, url)
+
+async def _summarize(req: SummarizeRequest, x_request_deadline: float | None):
+    # Validate input
+    if not req.domain or not req.domain.strip():
+        raise HTTPException(400, "Domain is required")
+    
+    # Clean domain
+    domain = clean_domain(req.domain)
+    
+    # try this worker's hot cache, then the database
+    body = _local_get(domain)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+    cached = None
+    try:
+        with engine.begin() as conn:
+            cached = conn.execute(text(f"""
+              SELECT domain, source_url, risk_score, response_body,
+                     CASE WHEN response_body IS NULL THEN summary_json END AS summary_json,
+                     EXTRACT(EPOCH FROM updated_at + INTERVAL '{CACHE_TTL_DAYS} days') as expires_at,
+                     (NOW() - updated_at) < INTERVAL '{CACHE_TTL_DAYS} days' as fresh
+              FROM site_summary WHERE domain=:d
+            """), {"d": domain}).fetchone()
+    except Exception as e:
+        # e.g. the database is still starting; analyze as a miss
+        print(f"Warning: Cache lookup failed: {e}")
+    if cached and cached.fresh and cached.response_body is not None:
+        # Pre-serialized passthrough: no JSONB decode, no model validation, no re-encode
+        body = bytes(cached.response_body)
+        _local_put(domain, body, float(cached.expires_at))
+        return Response(content=body, media_type="application/json")
     if cached and cached.fresh:
+        # Rows written before response_body existed
         return {
           "domain": cached.domain,
           "source_url": cached.source_url,
@@ -77,121 +337,90 @@ async def summarize(req: SummarizeRequest):
           }
         }
 
+    # Cache miss: a cold analysis, subject to admission control and the request's deadline
+    deadline.start(x_request_deadline)
     try:
-        src = pick_best_url(domain, req.candidate_urls)
+        async with admission.admit() as ticket:
+            return await analyze(domain, req.candidate_urls, ticket)
+    except Overloaded:
+        return overloaded_response(domain)
+
+async def analyze(domain: str, candidate_urls: list[str], ticket: Ticket) -> dict:
+    """Fetch, extract, score and summarize a domain's policy documents, then store the result."""
+    try:
+        src = pick_best_url(domain, candidate_urls)
         if not src:
             raise HTTPException(404, "No candidate policy URL found.")
         
-        _, text_content = await fetch_text(src)
+        # Privacy, cookie and terms pages are analyzed as one text; sections they
+        # share are kept once by split_sections
+        docs = await fetch_documents(domain, candidate_urls)
+        text_content = "\n\n".join(d["text"] for d in docs)
+        ticket.account(sum(d["html_length"] + len(d["text"]) for d in docs))
+        if docs:
+            src = docs[0]["url"]
     except HTTPException:
         raise
     except Exception as e:
         # Graceful fallback: continue with empty text so clients still get a response
         print(f"Warning: Failed to fetch content for {domain}: {e}")
         text_content = ""
+        docs = []
         src = f"https://{domain}/privacy"  # Fallback URL
 
-    # If AI is available, get an AI summary; else heuristic
-    ai_summary: dict | None = None
+    # Split into sections; unchanged sections reuse their stored heuristic counts and AI findings
+    sections = split_sections(text_content)
+    stored: dict = {}
+    if sections:
+        try:
+            with engine.begin() as conn:
+                stored = load_sections(conn, domain)
+        except Exception as e:
+            print(f"Warning: Failed to load stored sections: {e}")
+    _, changes = reuse_sections(sections, stored)
+
+    # If AI is available, get findings for the sections that have none yet, each section its own
     ai_task = None
-    if OPENAI_API_KEY or OLLAMA_HOST:
-        ai_task = asyncio.create_task(ai_summarize(text_content))
-
-    # Enhanced heuristic extraction
-    t = text_content.lower()
-    def has(k): return k in t
-
-    # More comprehensive data collection detection
-    data_collected = []
-    data_keywords = [
-        "email", "name", "phone", "location", "ip", "device", "cookie", "biometric", "payment",
-        "address", "age", "gender", "birth", "ssn", "social security", "credit card", "bank",
-        "financial", "health", "medical", "genetic", "dna", "sexual", "political", "religious",
-        "browsing history", "search history", "purchase history", "device id", "fingerprint"
-    ]
-    for k in data_keywords:
-        if has(k): data_collected.append(k)
-
-    # More comprehensive purposes detection
-    purposes = []
-    purpose_keywords = [
-        "ads", "advertising", "analytics", "personalization", "research", "improve services", 
-        "security", "marketing", "profiling", "behavioral", "targeted", "recommendations",
-        "customer service", "support", "legal", "compliance", "fraud prevention"
-    ]
-    for k in purpose_keywords:
-        if has(k): purposes.append(k)
-
-    # Enhanced sharing detection
-    sharing = "limited/unspecified"
-    if any(word in t for word in ["sell", "advertis", "share", "third party", "partner"]):
-        if any(word in t for word in ["do not sell", "no sale", "no sharing"]):
-            sharing = "not sold/shared"
-        else:
-            sharing = "sold/shared with advertisers/partners"
-    elif any(word in t for word in ["no third party", "no sharing", "internal only"]):
-        sharing = "not shared with third parties"
-
-    # Enhanced retention detection
-    retention = "unspecified"
-    if "indefinite" in t or "permanent" in t:
-        retention = "indefinite"
-    elif "30 days" in t or "1 month" in t:
-        retention = "30 days"
-    elif "90 days" in t or "3 months" in t:
-        retention = "90 days"
-    elif "12 months" in t or "1 year" in t:
-        retention = "12 months"
-    elif "24 months" in t or "2 years" in t:
-        retention = "24 months"
-    elif "delete" in t and ("30" in t or "60" in t or "90" in t):
-        retention = "automatic deletion"
-
-    # Enhanced user rights detection
-    rights = []
-    rights_keywords = [
-        "access", "delete", "portability", "opt-out", "opt out", "do not sell", "limit use",
-        "correct", "update", "withdraw", "consent", "unsubscribe", "right to be forgotten",
-        "data portability", "rectification", "erasure", "restriction", "objection"
-    ]
-    for k in rights_keywords:
-        if has(k): rights.append(k)
-    user_rights = ", ".join(sorted(set(rights))) or None
+    needs_ai = [s for s in sections if s["ai_findings"] is None]
+    if (OPENAI_API_KEY or OLLAMA_HOST) and needs_ai and deadline.allow("ai_summary"):
+        ai_task = asyncio.create_task(ai_summarize_sections(needs_ai))
+
+    # Enhanced heuristic extraction over the merged per-section counts
+    counts = merge_counts(sections)
+    summary_obj = summary_from_counts(counts)
 
     # Use enhanced AI-powered risk scoring with PrivacySpy integration
-    score, enhanced_insights = await enhanced_risk_score_with_privacyspy(text_content, domain)
-
-    summary_obj = Summary(
-        data_collected=sorted(set(data_collected)),
-        purposes=purposes,
-        sharing=sharing,
-        retention=retention,
-        user_rights=user_rights
+    score, enhanced_insights = await enhanced_risk_score_with_privacyspy(
+        text_content, domain, heuristic_score=risk_score_from_counts(counts)
     )
 
     if ai_task is not None:
         try:
-            ai_summary = await asyncio.wait_for(ai_task, timeout=8)
+            ai_findings = await asyncio.wait_for(ai_task, timeout=deadline.stage_timeout(8))
         except Exception as e:
             print(f"Warning: AI summarization failed: {e}")
-            ai_summary = None
+            ai_findings = {}
+        for s in needs_ai:
+            if s["hash"] in ai_findings:
+                s["ai_findings"] = ai_findings[s["hash"]]
 
+    ai_summary = merge_ai_findings(sections)
     summary = (ai_summary or summary_obj.model_dump())
+    if stored:
+        enhanced_insights["changes"] = changes
+    if len(docs) > 1:
+        enhanced_insights["documents"] = [d["url"] for d in docs]
+    if deadline.skipped_stages():
+        enhanced_insights["skipped_stages"] = deadline.skipped_stages()
 
-    # Store in database
-    try:
-        with engine.begin() as conn:
-            conn.execute(text("""
-              INSERT INTO site_summary(domain, source_url, summary_json, risk_score, updated_at)
-              VALUES (:d, :u, CAST(:s AS JSONB), :r, NOW())
-              ON CONFLICT (domain) DO UPDATE
-                SET source_url=EXCLUDED.source_url,
-                    summary_json=EXCLUDED.summary_json,
-                    risk_score=EXCLUDED.risk_score,
-                    updated_at=NOW()
-            """), {"d": domain, "u": src, "s": json.dumps(summary), "r": float(score)})
-    except Exception as e:
-        print(f"Warning: Failed to store in database: {e}")
+    # Hand the row to the write-behind buffer; it is stored (and every worker told
+    # about it) by the next batch flush, so the response doesn't wait on Postgres
+    body = cached_response_body(domain, src, summary, score)
+    expires_at = time.time() + CACHE_TTL_DAYS * 86400
+    await write_buffer.put(PendingWrite(domain, src, summary, float(score), body, sections, expires_at,
+                                        privacyspy=privacyspy_client.peek_product(domain)))
+    _local_put(domain, body, expires_at)
+    score_table.upsert(domain, float(score), time.time())
 
     # Add enhanced insights to the response
     response_data = {
@@ -205,24 +434,49 @@ async def summarize(req: SummarizeRequest):
     return response_data
 
 
-async def ai_summarize(text_content: str) -> dict | None:
-    """Optional AI summarization using OpenAI or local Ollama.
-    Returns Summary-like dict or None on failure.
+async def ai_summarize_sections(sections: list[dict]) -> dict[str, dict]:
+    """Optional AI findings for each section, from one OpenAI or Ollama call.
+    Returns {section hash: Summary-like dict}; sections past the prompt budget
+    or missing from the reply are left out and retried on the next refresh.
     """
-    content = text_content[:120000]
-    if not content:
-        return None
+    batch, used = [], 0
+    for s in sections:
+        if batch and used + len(s["text"]) > AI_SUMMARY_MAX_CHARS:
+            break
+        batch.append(s)
+        used += len(s["text"])
+    if not batch:
+        return {}
 
+    numbered = "\n\n".join(
+        f"[Section {i}] {s['title']}\n{s['text'][:AI_SUMMARY_MAX_CHARS]}" for i, s in enumerate(batch, 1)
+    )
     prompt = (
-        "Extract a concise privacy summary as strict JSON with keys: "
+        "For each numbered section of the privacy policy below, extract what that section says as strict JSON: "
+        '{"sections": {"<section number>": {...}}} where each value has keys '
         "data_collected (string[]), purposes (string[]), sharing (string), retention (string), user_rights (string). "
-        "Base only on the given policy text. If unknown, use empty array or 'unspecified'.\n\n"
-        "Policy text:\n" + content
+        "Include every section number. Base each entry only on that section's text. "
+        "If the section doesn't say, use empty array or 'unspecified'.\n\n"
+        "Policy sections:\n" + numbered
     )
 
-    # Prefer OpenAI if key provided
+    reply = await ai_json(prompt)
+    per_section = reply.get("sections") if reply else None
+    if not isinstance(per_section, dict):
+        return {}
+    findings = {}
+    for i, s in enumerate(batch, 1):
+        f = per_section.get(str(i))
+        if isinstance(f, dict):
+            findings[s["hash"]] = {k: f[k] for k in SUMMARY_KEYS if k in f}
+    return findings
+
+async def ai_json(prompt: str) -> dict | None:
+    """JSON object answer from OpenAI or local Ollama, or None on failure."""
+    # OpenAI first when configured; Ollama hedges a slow answer and covers a failed one
+    attempts = []
     if OPENAI_API_KEY:
-        try:
+        async def openai_call() -> str:
             import httpx
             headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
             body = {
@@ -231,33 +485,19 @@ async def ai_summarize(text_content: str) -> dict | None:
                 "response_format": {"type": "json_object"},
                 "temperature": 0.2,
             }
-            async with httpx.AsyncClient(timeout=15) as client:
+            async with httpx.AsyncClient(timeout=deadline.stage_timeout(15)) as client:
                 r = await client.post("https://api.openai.com/v1/chat/completions", json=body, headers=headers)
                 r.raise_for_status()
                 data = r.json()
-                message = data["choices"][0]["message"]["content"]
-                return json.loads(message)
-        except Exception:
-            return None
+                return data["choices"][0]["message"]["content"]
 
-    # Otherwise try Ollama
+        attempts.append(("openai", llm_gateway.prompt_key("summary", prompt), openai_call))
     if OLLAMA_HOST:
-        try:
-            import httpx
-            model = os.getenv("OLLAMA_MODEL", "llama3.1")
-            payload = {"model": model, "prompt": prompt, "stream": False}
-            url = f"{OLLAMA_HOST.rstrip('/')}/api/generate"
-            async with httpx.AsyncClient(timeout=15) as client:
-                r = await client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-                out = data.get("response", "{}").strip()
-                # try to locate json inside
-                start = out.find("{")
-                end = out.rfind("}")
-                if start != -1 and end != -1:
-                    return json.loads(out[start:end+1])
-        except Exception:
-            return None
-
-    return None
+        attempts.append(llm_gateway.ollama_attempt(prompt, 15))
+    if not attempts:
+        return None
+
+    try:
+        return await llm_gateway.hedged(attempts, llm_gateway.json_object)
+    except Exception:
+        return None
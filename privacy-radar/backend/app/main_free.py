@@ -1,28 +1,51 @@
 import os
-import json
+import time
 import asyncio
-from fastapi import FastAPI, HTTPException
+from datetime import datetime, timezone
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from .models import SummarizeRequest, SummarizeResponse, Summary
-from .extract import pick_best_url, fetch_text
+from .extract import pick_best_url, fetch_text, fetch_documents
 from .scoring import risk_score, enhanced_risk_score
 from .privacyspy import enhanced_risk_score_with_privacyspy
+from .warmup import schedule_warm_up
+from .admission import admission, Overloaded, Ticket, overloaded_response
+from .snapshot import open_snapshot
+from . import deadline, profiling, llm_gateway, loop_monitor
 
 CORS_ORIGIN = os.getenv("CORS_ORIGIN", "*")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "").strip()
+CACHE_TTL_DAYS = int(os.getenv("CACHE_TTL_DAYS", "14"))
+MAX_SCORE_DOMAINS = int(os.getenv("MAX_SCORE_DOMAINS", "100"))
+SCORES_CACHE_MAX_AGE = int(os.getenv("SCORES_CACHE_MAX_AGE", "300"))
 
 app = FastAPI(title="Privacy Radar API (Free Version)")
 
+app.include_router(profiling.router)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[CORS_ORIGIN, "http://localhost:3000"],
     allow_methods=["*"], allow_headers=["*"]
 )
 
+# Precomputed scores (SNAPSHOT_PATH), memory-mapped read-only; None without one
+snapshot = None
+
+@app.on_event("startup")
+async def _startup():
+    global snapshot
+    snapshot = open_snapshot()
+    loop_monitor.start()
+    schedule_warm_up()
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "privacy-radar-api-free"}
+    return {"status": "healthy", "service": "privacy-radar-api-free", "admission": admission.stats(),
+            "llm": llm_gateway.stats(), "snapshot_domains": len(snapshot) if snapshot else 0,
+            "event_loop": loop_monitor.loop_monitor.stats()}
 
 
 @app.get("/")
@@ -32,13 +55,51 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /summarize": "Analyze privacy policy",
+            "GET /scores?domains=a,b": "Badge scores for domains in the snapshot",
             "GET /health": "Health check",
             "GET /docs": "API documentation"
         }
     }
 
+@app.get("/scores")
+async def get_scores(domains: str):
+    """Badge lookup: risk score and freshness for up to MAX_SCORE_DOMAINS
+    comma-separated domains. This build stores nothing, so only snapshot
+    domains are known; the rest map to null.
+    """
+    now = time.time()
+    ttl = CACHE_TTL_DAYS * 86400
+    scores = {}
+    for raw in domains.split(",")[:MAX_SCORE_DOMAINS]:
+        domain = raw.strip().lower()
+        if not domain:
+            continue
+        key = domain[4:] if domain.startswith("www.") else domain
+        hit = snapshot.score(key) if snapshot else None
+        scores[domain] = None if hit is None else {
+            "risk_score": round(hit[0], 1),
+            "fresh": now - hit[1] < ttl,
+            "updated_at": int(hit[1]),
+        }
+    return JSONResponse(
+        {"scores": scores, "table_loaded": snapshot is not None},
+        headers={"Cache-Control": f"public, max-age={SCORES_CACHE_MAX_AGE}"},
+    )
+
 @app.post("/summarize")
-async def summarize(req: SummarizeRequest):
+async def summarize(req: SummarizeRequest,
+                    x_request_deadline: float | None = Header(default=None),
+                    x_profile: str | None = Header(default=None)):
+    profile = profiling.start(x_profile, req.domain)
+    if profile is None:
+        return await _summarize(req, x_request_deadline)
+    try:
+        result = await _summarize(req, x_request_deadline)
+    finally:
+        url = profile.stop()
+    return profiling.attach(result, url)
+
+async def _summarize(req: SummarizeRequest, x_request_deadline: float | None):
     if not req.domain or not req.domain.strip():
         raise HTTPException(400, "Domain is required")
     
@@ -46,10 +107,35 @@ async def summarize(req: SummarizeRequest):
     if domain.startswith("www."):
         domain = domain[4:]
     
-    print(f"Analyzing domain: {domain}")
+    # Known domains are answered from the snapshot without fetching anything. This build
+    # can't store a refresh, so entries past CACHE_TTL_DAYS are still served, marked stale
+    entry = snapshot.get(domain) if snapshot else None
+    if entry:
+        return {
+            "domain": domain,
+            "source_url": entry["source_url"],
+            "summary": entry["summary"],
+            "risk_score": entry["risk_score"],
+            "enhanced_insights": {
+                "data_source": "snapshot",
+                "privacyspy_available": False,
+                "fresh": time.time() - entry["updated_at"] < CACHE_TTL_DAYS * 86400,
+                "updated_at": datetime.fromtimestamp(entry["updated_at"], timezone.utc).isoformat(),
+                "note": "Using precomputed analysis"
+            }
+        }
     
-    candidate_urls = req.candidate_urls or []
+    print(f"Analyzing domain: {domain}")
     
+    # Every other request here is a cold analysis, subject to admission control and the request's deadline
+    deadline.start(x_request_deadline)
+    try:
+        async with admission.admit() as ticket:
+            return await analyze(domain, req.candidate_urls or [], ticket)
+    except Overloaded:
+        return overloaded_response(domain)
+
+async def analyze(domain: str, candidate_urls: list[str], ticket: Ticket) -> dict:
     if not candidate_urls:
         candidate_urls = [
             f"https://{domain}/privacy",
@@ -64,8 +150,13 @@ async def summarize(req: SummarizeRequest):
     if not src:
         raise HTTPException(404, f"No privacy policy found for {domain}")
     
-    print(f"Fetching text from: {src}")
-    html_content, text_content = await fetch_text(src)
+    # Privacy, cookie and terms pages are analyzed as one text
+    print(f"Fetching policy documents, best first: {src}")
+    docs = await fetch_documents(domain, candidate_urls)
+    text_content = "\n\n".join(d["text"] for d in docs)
+    ticket.account(sum(d["html_length"] + len(d["text"]) for d in docs))
+    if docs:
+        src = docs[0]["url"]
     if not text_content or len(text_content.strip()) < 100:
         # Try alternative URLs if the first one failed
         alternative_urls = [
@@ -77,10 +168,14 @@ async def summarize(req: SummarizeRequest):
         ]
         
         for alt_url in alternative_urls:
+            if not deadline.allow("alternative_urls"):
+                break
             print(f"Trying alternative URL: {alt_url}")
             html_content, text_content = await fetch_text(alt_url)
+            ticket.account(len(html_content) + len(text_content))
             if text_content and len(text_content.strip()) >= 100:
                 src = alt_url
+                docs = [{"url": alt_url}]
                 break
         
         if not text_content or len(text_content.strip()) < 100:
@@ -105,7 +200,8 @@ async def summarize(req: SummarizeRequest):
                     "transparency": "low",
                     "compliance": "unknown",
                     "key_concerns": ["No privacy policy found", "Lack of transparency"],
-                    "privacy_strengths": []
+                    "privacy_strengths": [],
+                    "skipped_stages": deadline.skipped_stages()
                 }
             }
     
@@ -192,18 +288,22 @@ async def summarize(req: SummarizeRequest):
     )
 
     ai_task = None
-    if OPENAI_API_KEY or OLLAMA_HOST:
+    if (OPENAI_API_KEY or OLLAMA_HOST) and deadline.allow("ai_summary"):
         ai_task = asyncio.create_task(ai_summarize(text_content))
 
     ai_summary = None
     if ai_task is not None:
         try:
-            ai_summary = await asyncio.wait_for(ai_task, timeout=8)
+            ai_summary = await asyncio.wait_for(ai_task, timeout=deadline.stage_timeout(8))
         except Exception as e:
             print(f"Warning: AI summarization failed: {e}")
             ai_summary = None
 
     summary = (ai_summary or summary_obj.model_dump())
+    if len(docs) > 1:
+        enhanced_insights["documents"] = [d["url"] for d in docs]
+    if deadline.skipped_stages():
+        enhanced_insights["skipped_stages"] = deadline.skipped_stages()
 
     response_data = {
         "domain": domain, 
@@ -218,57 +318,35 @@ async def summarize(req: SummarizeRequest):
 
 
 async def ai_summarize(text_content: str) -> dict | None:
-    try:
-        if OPENAI_API_KEY:
+    # OpenAI first when configured; Ollama hedges a slow answer and covers a failed one
+    attempts = []
+    if OPENAI_API_KEY:
+        async def openai_call() -> str:
             import openai
             client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-            
             response = await client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Extract privacy policy information in JSON format with fields: data_collected (list), purposes (list), sharing (string), retention (string), user_rights (string). Be concise and accurate."},
                     {"role": "user", "content": f"Analyze this privacy policy:\n\n{text_content[:4000]}"}
                 ],
-                temperature=0.1
+                temperature=0.1,
+                timeout=deadline.stage_timeout(30.0)
             )
-            
-            content = response.choices[0].message.content
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.endswith("```"):
-                content = content[:-3]
-            
-            return json.loads(content.strip())
-            
-        elif OLLAMA_HOST:
-            import httpx
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{OLLAMA_HOST}/api/generate",
-                    json={
-                        "model": "llama2",
-                        "prompt": f"Extract privacy policy information in JSON format with fields: data_collected (list), purposes (list), sharing (string), retention (string), user_rights (string). Be concise and accurate.\n\nPrivacy policy:\n{text_content[:4000]}",
-                        "stream": False
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result.get("response", "")
-                    
-                    if "```json" in content:
-                        content = content.split("```json")[1].split("```")[0]
-                    elif "{" in content and "}" in content:
-                        start = content.find("{")
-                        end = content.rfind("}") + 1
-                        content = content[start:end]
-                    
-                    return json.loads(content.strip())
-                    
+            return response.choices[0].message.content
+        
+        attempts.append(("openai", llm_gateway.prompt_key("summary", text_content[:4000]), openai_call))
+    if OLLAMA_HOST:
+        attempts.append(llm_gateway.ollama_attempt(
+            f"Extract privacy policy information in JSON format with fields: data_collected (list), purposes (list), sharing (string), retention (string), user_rights (string). Be concise and accurate.\n\nPrivacy policy:\n{text_content[:4000]}",
+            30.0
+        ))
+    if not attempts:
+        return None
+    
+    try:
+        # json_object skips ```json fences and any text around the object
+        return await llm_gateway.hedged(attempts, llm_gateway.json_object)
     except Exception as e:
         print(f"AI summarization error: {e}")
         return None
-    
-    return None
\ No newline at end of file
@@ -1,9 +1,10 @@
-import httpx
+import os
 import json
 from typing import Optional, Dict, Any
 import asyncio
+from . import deadline
 
-PRIVACYSPY_BASE_URL = "https://privacyspy.org/api/v2"
+PRIVACYSPY_BASE_URL = os.getenv("PRIVACYSPY_BASE_URL", "https://privacyspy.org/api/v2").rstrip("/")
 PRIVACYSPY_ATTRIBUTION = "Data provided by PrivacySpy (https://privacyspy.org) under Creative Commons BY license"
 
 class PrivacySpyClient:
@@ -24,9 +25,12 @@ class PrivacySpyClient:
             if asyncio.get_event_loop().time() - timestamp < self.cache_ttl:
                 return cached_data
         
+        if not deadline.allow("privacyspy"):
+            return None
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.base_url}/products/{domain}")
+            import httpx
+            async with httpx.AsyncClient(timeout=deadline.stage_timeout(10.0)) as client:
+                response = await deadline.bounded("privacyspy", client.get(f"{self.base_url}/products/{domain}"))
                 if response.status_code == 200:
                     data = response.json()
                     self.cache[cache_key] = (data, asyncio.get_event_loop().time())
@@ -36,6 +40,22 @@ class PrivacySpyClient:
         
         return None
     
+    def peek_product(self, domain: str) -> Optional[Dict[str, Any]]:
+        """Cached product data for ``domain`` if present and fresh; never hits the network."""
+        entry = self.cache.get(f"domain:{domain.lower().strip()}")
+        if entry is None:
+            return None
+        cached_data, timestamp = entry
+        if asyncio.get_event_loop().time() - timestamp >= self.cache_ttl:
+            return None
+        return cached_data
+    
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Warm the cache with product data another worker fetched for a site_summary write.
+        Writes don't change PrivacySpy data, so nothing is invalidated."""
+        if event.get("event") == "update" and event.get("privacyspy"):
+            self.cache[f"domain:{event['domain']}"] = (event["privacyspy"], asyncio.get_event_loop().time())
+    
     def convert_privacyspy_score_to_risk(self, privacyspy_score: float) -> float:
         if privacyspy_score is None:
             return 50.0
@@ -106,10 +126,18 @@ privacyspy_client = PrivacySpyClient()
 async def get_privacyspy_data(domain: str) -> Optional[Dict[str, Any]]:
     return await privacyspy_client.get_product_by_domain(domain)
 
-async def enhanced_risk_score_with_privacyspy(text: str, domain: str) -> tuple[float, Dict[str, Any]]:
+async def enhanced_risk_score_with_privacyspy(text: str, domain: str,
+                                              heuristic_score: Optional[float] = None,
+                                              model_score: Optional[float] = None) -> tuple[float, Dict[str, Any]]:
     privacyspy_data = await get_privacyspy_data(domain)
     
     base_risk_score = 50.0
+
+    # Local model trained on PrivacySpy ratings, when one has been trained.
+    # Featurizing a long policy is CPU work: keep it off the event loop
+    if model_score is None and text:
+        from .risk_model import model_risk_score
+        model_score = await asyncio.to_thread(model_risk_score, text)
     
     enhanced_insights = {
         "data_source": "heuristic",
@@ -123,6 +151,20 @@ async def enhanced_risk_score_with_privacyspy(text: str, domain: str) -> tuple[f
         "privacy_strengths": [],
         "attribution": "Privacy Radar analysis"
     }
+
+    if model_score is not None:
+        base_risk_score = model_score
+        enhanced_insights["data_source"] = "model"
+        enhanced_insights["model_score"] = model_score
+        if not privacyspy_data and text:
+            # The text score is the answer here: the LLM settles a model/heuristic disagreement
+            from .scoring import risk_score, tiebreak_score
+            if heuristic_score is None:
+                heuristic_score = risk_score(text)
+            base_risk_score = await tiebreak_score(text, model_score, heuristic_score)
+            if base_risk_score != model_score:
+                enhanced_insights["heuristic_score"] = heuristic_score
+                enhanced_insights["ai_tiebreak"] = True
     
     if privacyspy_data:
         enhanced_insights["privacyspy_available"] = True
@@ -139,14 +181,16 @@ async def enhanced_risk_score_with_privacyspy(text: str, domain: str) -> tuple[f
         enhanced_insights["data_source"] = "privacyspy"
         enhanced_insights["attribution"] = PRIVACYSPY_ATTRIBUTION
         
-        from .scoring import risk_score
-        heuristic_score = risk_score(text)
+        if heuristic_score is None:
+            from .scoring import risk_score
+            heuristic_score = risk_score(text)
         
         if not privacyspy_data:
             base_risk_score = heuristic_score
             enhanced_insights["data_source"] = "heuristic"
         else:
-            base_risk_score = (privacyspy_risk * 0.7) + (heuristic_score * 0.3)
+            text_score = model_score if model_score is not None else heuristic_score
+            base_risk_score = (privacyspy_risk * 0.7) + (text_score * 0.3)
             enhanced_insights["data_source"] = "blended"
             enhanced_insights["heuristic_score"] = heuristic_score
     
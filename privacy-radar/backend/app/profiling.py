@@ -0,0 +1,63 @@
+import os
+import re
+import time
+import uuid
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import FileResponse
+
+# Off unless explicitly enabled; when off, start() is a single flag check
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").strip().lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/privacy-radar-profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+PROFILE_HEADER = "X-Profile"
+
+_NAME_PAT = re.compile(r"^[\w.-]+\.speedscope\.json$")
+
+class RequestProfile:
+    """Sampling profile (pyinstrument, async-aware) of one request, saved as speedscope JSON."""
+
+    def __init__(self, label: str):
+        from pyinstrument import Profiler
+        self.label = re.sub(r"[^\w.-]", "_", label)[:64]
+        self.profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        self.profiler.start()
+
+    def stop(self) -> str:
+        """Stop sampling, write the file and return its URL path."""
+        from pyinstrument.renderers import SpeedscopeRenderer
+        self.profiler.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{int(time.time())}-{self.label}-{uuid.uuid4().hex[:8]}.speedscope.json"
+        with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(self.profiler.output(renderer=SpeedscopeRenderer()))
+        return f"/profiles/{name}"
+
+def start(header_value: str | None, label: str) -> RequestProfile | None:
+    """Profile this request if profiling is enabled and the client asked for it."""
+    if not PROFILING_ENABLED or not header_value or header_value.strip() in ("0", "false"):
+        return None
+    try:
+        return RequestProfile(label)
+    except ImportError:
+        print("Warning: profiling requested but pyinstrument is not installed")
+        return None
+
+def attach(result, url: str):
+    """Point the client at the profile: a header on raw responses, else in enhanced_insights."""
+    if isinstance(result, Response):
+        result.headers["X-Profile-Url"] = url
+    elif isinstance(result, dict):
+        result.setdefault("enhanced_insights", {})["profile_url"] = url
+    return result
+
+router = APIRouter()
+
+@router.get("/profiles/{name}")
+async def get_profile(name: str):
+    """Download a saved profile; open it at https://www.speedscope.app."""
+    if not PROFILING_ENABLED or not _NAME_PAT.match(name):
+        raise HTTPException(404, "Profile not found")
+    path = os.path.join(PROFILE_DIR, name)
+    if not os.path.exists(path):
+        raise HTTPException(404, "Profile not found")
+    return FileResponse(path, media_type="application/json")
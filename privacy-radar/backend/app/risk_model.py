@@ -0,0 +1,148 @@
+import os
+import re
+import zlib
+import time
+
+# numpy is imported lazily (see extract.py) so the API starts without it
+RISK_MODEL_PATH = os.getenv("RISK_MODEL_PATH", os.path.join(os.path.dirname(__file__), "risk_model.npz"))
+MODEL_VERSION = 1
+
+TOKEN_PAT = re.compile(r"[a-z][a-z0-9'-]+")
+# Token -> signed feature index; vocabularies of policy text are small and repetitive
+_HASH_MEMO_LIMIT = 200_000
+
+def privacyspy_to_risk(privacyspy_score: float) -> float:
+    """Continuous version of PrivacySpyClient.convert_privacyspy_score_to_risk (0-10 -> 99-0)."""
+    return max(0.0, min(99.0, (10.0 - float(privacyspy_score)) * 9.9))
+
+class RiskModel:
+    """Linear model over signed, hashed word n-grams (log-scaled, L2-normalized counts)."""
+
+    def __init__(self, weights, bias: float, n_features: int, ngram: int, meta: dict | None = None):
+        self.weights = weights
+        self.bias = float(bias)
+        self.n_features = n_features
+        self.ngram = ngram
+        self.meta = meta or {}
+        self._memo: dict[str, int] = {}
+
+    def _index(self, term: str) -> int:
+        idx = self._memo.get(term)
+        if idx is None:
+            h = zlib.crc32(term.encode())
+            # The top bit picks the sign so colliding terms tend to cancel instead of add up
+            idx = (h % self.n_features) + 1
+            if h & 0x80000000:
+                idx = -idx
+            if len(self._memo) < _HASH_MEMO_LIMIT:
+                self._memo[term] = idx
+        return idx
+
+    def featurize(self, text: str):
+        """Sparse feature vector as (indices, values) arrays."""
+        import numpy as np
+        tokens = TOKEN_PAT.findall(text.lower())
+        terms = list(tokens)
+        for n in range(2, self.ngram + 1):
+            terms += [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        if not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        signed = np.fromiter((self._index(t) for t in terms), dtype=np.int64, count=len(terms))
+        idx, inverse = np.unique(np.abs(signed) - 1, return_inverse=True)
+        sums = np.bincount(inverse, weights=np.sign(signed), minlength=len(idx))
+        values = np.sign(sums) * np.log1p(np.abs(sums))
+        norm = np.linalg.norm(values)
+        if norm > 0:
+            values = values / norm
+        return idx, values.astype(np.float32)
+
+    def score(self, text: str) -> float:
+        return float(self.score_batch([text])[0])
+
+    def score_batch(self, texts: list[str]):
+        """Risk scores (0-99) for many texts with one vectorized dot product."""
+        import numpy as np
+        feats = [self.featurize(t) for t in texts]
+        if not feats:
+            return np.zeros(0, dtype=np.float32)
+        lengths = np.array([len(i) for i, _ in feats])
+        idx = np.concatenate([i for i, _ in feats])
+        vals = np.concatenate([v for _, v in feats])
+        doc = np.repeat(np.arange(len(feats)), lengths)
+        scores = np.bincount(doc, weights=self.weights[idx] * vals, minlength=len(feats)) + self.bias
+        return np.clip(scores, 0.0, 99.0)
+
+    @classmethod
+    def fit(cls, texts: list[str], targets: list[float], n_features: int = 2 ** 17,
+            ngram: int = 2, alpha: float = 1.0, block: int = 8192) -> "RiskModel":
+        """Ridge regression solved in the dual (n_samples x n_samples), which stays
+        small for a corpus of a few thousand policies regardless of n_features.
+        The Gram matrix is accumulated over column blocks so X is never dense in full.
+        """
+        import numpy as np
+        model = cls(np.zeros(n_features, dtype=np.float32), 0.0, n_features, ngram)
+        feats = [model.featurize(t) for t in texts]
+        n = len(feats)
+        y = np.asarray(targets, dtype=np.float64)
+        bias = float(y.mean())
+
+        rows = np.repeat(np.arange(n), [len(i) for i, _ in feats])
+        idx = np.concatenate([i for i, _ in feats])
+        vals = np.concatenate([v for _, v in feats])
+        gram = np.zeros((n, n), dtype=np.float64)
+        for start in range(0, n_features, block):
+            mask = (idx >= start) & (idx < start + block)
+            if not mask.any():
+                continue
+            Xb = np.zeros((n, block), dtype=np.float32)
+            Xb[rows[mask], idx[mask] - start] = vals[mask]
+            gram += Xb @ Xb.T
+
+        coef = np.linalg.solve(gram + alpha * np.eye(n), y - bias)
+        weights = np.zeros(n_features, dtype=np.float64)
+        np.add.at(weights, idx, coef[rows] * vals)
+        model.weights = weights.astype(np.float32)
+        model.bias = bias
+        model.meta = {"n_samples": len(feats), "alpha": alpha, "trained_at": int(time.time())}
+        return model
+
+    def save(self, path: str) -> None:
+        import json
+        import numpy as np
+        np.savez_compressed(
+            path, weights=self.weights, bias=np.float32(self.bias),
+            n_features=np.int64(self.n_features), ngram=np.int64(self.ngram),
+            version=np.int64(MODEL_VERSION), meta=np.array(json.dumps(self.meta)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RiskModel":
+        import json
+        import numpy as np
+        with np.load(path) as data:
+            if int(data["version"]) != MODEL_VERSION:
+                raise ValueError(f"Unsupported risk model version {int(data['version'])}")
+            return cls(data["weights"], float(data["bias"]), int(data["n_features"]),
+                       int(data["ngram"]), json.loads(str(data["meta"])))
+
+_model: RiskModel | None = None
+_model_checked = False
+
+def get_model() -> RiskModel | None:
+    """The trained model at RISK_MODEL_PATH, loaded once; None if not available."""
+    global _model, _model_checked
+    if not _model_checked:
+        _model_checked = True
+        if os.path.exists(RISK_MODEL_PATH):
+            try:
+                _model = RiskModel.load(RISK_MODEL_PATH)
+            except Exception as e:
+                print(f"Warning: Failed to load risk model {RISK_MODEL_PATH}: {e}")
+    return _model
+
+def model_risk_score(text: str) -> float | None:
+    model = get_model()
+    if model is None or not text:
+        return None
+    return model.score(text)
@@ -0,0 +1,52 @@
+from array import array
+from bisect import bisect_left
+from sqlalchemy import text
+
+class ScoreTable:
+    """Compact in-memory domain -> (risk score, updated_at) index for badge lookups.
+
+    Domains are kept in a sorted list with parallel ``array`` columns, so a
+    lookup is one bisect and the whole table costs a few dozen bytes per
+    domain instead of a dict of row objects.
+    """
+
+    def __init__(self):
+        self.domains: list[str] = []
+        self.scores = array("f")
+        self.updated_at = array("d")  # epoch seconds
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self.domains)
+
+    def load(self, rows) -> None:
+        """Replace the table with ``(domain, risk_score, updated_at_epoch)`` rows."""
+        rows = sorted(rows, key=lambda r: r[0])
+        self.domains = [r[0] for r in rows]
+        self.scores = array("f", (float(r[1]) for r in rows))
+        self.updated_at = array("d", (float(r[2]) for r in rows))
+        self.loaded = True
+
+    def get(self, domain: str) -> tuple[float, float] | None:
+        i = bisect_left(self.domains, domain)
+        if i < len(self.domains) and self.domains[i] == domain:
+            return self.scores[i], self.updated_at[i]
+        return None
+
+    def upsert(self, domain: str, score: float, updated_at: float) -> None:
+        i = bisect_left(self.domains, domain)
+        if i < len(self.domains) and self.domains[i] == domain:
+            self.scores[i] = score
+            self.updated_at[i] = updated_at
+        else:
+            self.domains.insert(i, domain)
+            self.scores.insert(i, score)
+            self.updated_at.insert(i, updated_at)
+
+def load_score_rows(conn):
+    return conn.execute(text("""
+      SELECT domain, risk_score, EXTRACT(EPOCH FROM updated_at) AS updated_at
+      FROM site_summary WHERE risk_score IS NOT NULL
+    """)).fetchall()
+
+score_table = ScoreTable()
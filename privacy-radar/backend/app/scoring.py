@@ -2,7 +2,7 @@ import re
 import os
 import json
 import asyncio
-import httpx
+from . import deadline, llm_gateway
 
 KEYWORDS = {
     "sell": 20, "third party": 12, "advertis": 10, "retain indefinitely": 10,
@@ -33,52 +33,47 @@ SAFE = {
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "").strip()
+# Model and keyword scores further apart than this get an LLM opinion as tie-breaker
+TIEBREAK_GAP = float(os.getenv("TIEBREAK_GAP", "30"))
 
 async def ai_risk_score(text: str) -> float:
     if not OPENAI_API_KEY and not OLLAMA_HOST:
         return None
+    if not deadline.allow("ai_risk_score"):
+        return None
     
-    try:
-        if OPENAI_API_KEY:
+    attempts = []
+    if OPENAI_API_KEY:
+        async def openai_call() -> str:
             import openai
             client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-            
             response = await client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Analyze this privacy policy and provide a risk score from 0-99 where 0 is very low risk (privacy-friendly) and 99 is very high risk (privacy-concerning). Consider data collection, sharing, retention, user rights, and transparency. Respond with only a number."},
                     {"role": "user", "content": f"Privacy policy text:\n\n{text[:3000]}"}
                 ],
-                temperature=0.1
+                temperature=0.1,
+                timeout=deadline.stage_timeout(30.0)
             )
-            
-            score_text = response.choices[0].message.content.strip()
-            score = float(re.findall(r'\d+', score_text)[0])
-            return max(0.0, min(99.0, score))
-            
-        elif OLLAMA_HOST:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{OLLAMA_HOST}/api/generate",
-                    json={
-                        "model": "llama2",
-                        "prompt": f"Analyze this privacy policy and provide a risk score from 0-99 where 0 is very low risk (privacy-friendly) and 99 is very high risk (privacy-concerning). Consider data collection, sharing, retention, user rights, and transparency. Respond with only a number.\n\nPrivacy policy:\n{text[:3000]}",
-                        "stream": False
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    score_text = result.get("response", "").strip()
-                    score = float(re.findall(r'\d+', score_text)[0])
-                    return max(0.0, min(99.0, score))
-                    
+            return response.choices[0].message.content
+        
+        attempts.append(("openai", llm_gateway.prompt_key("risk_score", text[:3000]), openai_call))
+    if OLLAMA_HOST:
+        attempts.append(llm_gateway.ollama_attempt(
+            f"Analyze this privacy policy and provide a risk score from 0-99 where 0 is very low risk (privacy-friendly) and 99 is very high risk (privacy-concerning). Consider data collection, sharing, retention, user rights, and transparency. Respond with only a number.\n\nPrivacy policy:\n{text[:3000]}",
+            30.0
+        ))
+    
+    def parse_score(score_text: str) -> float:
+        score = float(re.findall(r'\d+', score_text.strip())[0])
+        return max(0.0, min(99.0, score))
+    
+    try:
+        return await llm_gateway.hedged(attempts, parse_score)
     except Exception as e:
         print(f"AI scoring error: {e}")
         return None
-    
-    return None
 
 def risk_score(text: str) -> float:
     text_lower = text.lower()
@@ -96,7 +91,32 @@ def risk_score(text: str) -> float:
     
     return max(0.0, min(99.0, float(score)))
 
+def risk_score_from_counts(counts: dict[str, int]) -> float:
+    """risk_score over precomputed keyword counts (e.g. summed per-section counts)."""
+    score = 0.0
+    for keyword, weight in KEYWORDS.items():
+        score += weight * counts.get(keyword, 0)
+    for keyword, weight in SAFE.items():
+        score += weight * counts.get(keyword, 0)
+    return max(0.0, min(99.0, float(score)))
+
+async def tiebreak_score(text: str, model_score: float, heuristic_score: float) -> float:
+    """The local model's score, or the median of model, heuristic and LLM scores
+    when model and heuristic disagree by TIEBREAK_GAP or more.
+    """
+    if text and (OPENAI_API_KEY or OLLAMA_HOST) and abs(model_score - heuristic_score) >= TIEBREAK_GAP:
+        ai_score = await ai_risk_score(text)
+        if ai_score is not None:
+            return sorted([model_score, heuristic_score, ai_score])[1]
+    return model_score
+
 async def enhanced_risk_score(text: str) -> float:
+    from .risk_model import model_risk_score
+    local_score = await asyncio.to_thread(model_risk_score, text)
+    if local_score is not None:
+        # The local model is the hot path; the LLM only breaks ties with the heuristic
+        return await tiebreak_score(text, local_score, risk_score(text))
+
     if OPENAI_API_KEY or OLLAMA_HOST:
         ai_score = await ai_risk_score(text)
         if ai_score is not None:
@@ -0,0 +1,152 @@
+import hashlib
+import json
+from sqlalchemy import text
+from .analysis import term_counts
+
+# Lines that look like headings start a new section
+MAX_HEADING_CHARS = 80
+MAX_HEADING_WORDS = 10
+# Tiny sections are folded into the previous one so a one-line edit can't split a section
+MIN_SECTION_CHARS = 200
+
+def _is_heading(line: str) -> bool:
+    if len(line) > MAX_HEADING_CHARS or len(line.split()) > MAX_HEADING_WORDS:
+        return False
+    if line[-1] in ".,;" or not line[0].isalnum() or line[0].islower():
+        return False
+    return True
+
+def section_hash(body: str) -> str:
+    """Hash of the whitespace/case-normalized section text, stable across re-fetches."""
+    normalized = " ".join(body.lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+def split_sections(text_content: str) -> list[dict]:
+    """Split extracted policy text at heading-like lines.
+
+    Returns ``[{"hash", "title", "text"}]`` in document order. Sections with
+    identical text are kept once since they contribute the same findings.
+    """
+    sections: list[dict] = []
+    title, lines = "", []
+
+    def close():
+        body = "\n".join(lines)
+        if not body.strip():
+            return
+        if sections and len(body) < MIN_SECTION_CHARS:
+            sections[-1]["text"] += "\n" + body
+        else:
+            sections.append({"title": title, "text": body})
+
+    for line in text_content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _is_heading(line) and (not lines or sum(len(l) for l in lines) >= MIN_SECTION_CHARS):
+            close()
+            title, lines = line, []
+        lines.append(line)
+    close()
+
+    unique = {}
+    for s in sections:
+        s["hash"] = section_hash(s["text"])
+        unique.setdefault(s["hash"], s)
+    return list(unique.values())
+
+def load_sections(conn, domain: str) -> dict[str, dict]:
+    rows = conn.execute(text("""
+      SELECT section_hash, title, counts, ai_findings, updated_at
+      FROM site_section WHERE domain=:d ORDER BY position
+    """), {"d": domain}).fetchall()
+    return {
+        r.section_hash: {"title": r.title, "counts": r.counts, "ai_findings": r.ai_findings,
+                         "updated_at": r.updated_at}
+        for r in rows
+    }
+
+def store_sections(conn, domain: str, sections: list[dict]) -> None:
+    """Replace the stored sections of ``domain`` with ``sections`` (positions follow list order)."""
+    conn.execute(text("""
+      DELETE FROM site_section WHERE domain=:d AND NOT (section_hash = ANY(:hashes))
+    """), {"d": domain, "hashes": [s["hash"] for s in sections]})
+    if not sections:
+        return
+    conn.execute(text("""
+      INSERT INTO site_section(domain, section_hash, position, title, counts, ai_findings, updated_at)
+      VALUES (:d, :h, :p, :t, CAST(:c AS JSONB), CAST(:a AS JSONB), COALESCE(CAST(:u AS TIMESTAMP), NOW()))
+      ON CONFLICT (domain, section_hash) DO UPDATE
+        SET position=EXCLUDED.position,
+            title=EXCLUDED.title,
+            ai_findings=EXCLUDED.ai_findings,
+            updated_at=EXCLUDED.updated_at
+    """), [
+        {"d": domain, "h": s["hash"], "p": i, "t": s["title"], "c": json.dumps(s["counts"]),
+         "a": json.dumps(s["ai_findings"]) if s.get("ai_findings") is not None else None,
+         "u": s.get("updated_at")}
+        for i, s in enumerate(sections)
+    ])
+
+def reuse_sections(sections: list[dict], stored: dict[str, dict]) -> tuple[list[dict], dict]:
+    """Fill each section's counts/AI findings from ``stored`` where the hash matches,
+    computing heuristic counts only for new or changed sections.
+
+    Returns the list of changed sections and a "what changed" diff.
+    """
+    changed = []
+    for s in sections:
+        prev = stored.get(s["hash"])
+        if prev is not None:
+            s["counts"] = prev["counts"]
+            s["ai_findings"] = prev["ai_findings"]
+            s["updated_at"] = prev["updated_at"]
+        else:
+            s["counts"] = term_counts(s["text"])
+            s["ai_findings"] = None
+            changed.append(s)
+
+    current = {s["hash"] for s in sections}
+    diff = {
+        "added": [s["title"] for s in changed],
+        "removed": [p["title"] for h, p in stored.items() if h not in current],
+        "unchanged": len(sections) - len(changed),
+    }
+    return changed, diff
+
+def merge_counts(sections: list[dict]) -> dict[str, int]:
+    merged: dict[str, int] = {}
+    for s in sections:
+        for k, c in s["counts"].items():
+            merged[k] = merged.get(k, 0) + c
+    return merged
+
+def merge_ai_findings(sections: list[dict]) -> dict | None:
+    """Merge per-section AI findings: lists are unioned, and for scalar fields
+    the newest specific answer wins. Identical findings of several sections count once.
+    """
+    findings = []
+    # Oldest stored findings first, then the ones produced on this run
+    ordered = sorted(sections, key=lambda s: (s.get("updated_at") is None, s.get("updated_at") or 0))
+    for s in ordered:
+        f = s.get("ai_findings")
+        if f and f not in findings:
+            findings.append(f)
+    if not findings:
+        return None
+
+    merged = {"data_collected": [], "purposes": [], "sharing": "unspecified",
+              "retention": "unspecified", "user_rights": "unspecified"}
+    for f in findings:
+        for key in ("data_collected", "purposes"):
+            items = f.get(key)
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if item not in merged[key]:
+                    merged[key].append(item)
+        for key in ("sharing", "retention", "user_rights"):
+            value = f.get(key)
+            if value and value != "unspecified":
+                merged[key] = value
+    return merged
@@ -0,0 +1,201 @@
+import os
+import mmap
+import time
+import struct
+import orjson
+
+# Read-only precomputed scores for the free build (see score_snapshot.py)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "").strip()
+
+MAGIC = b"PRSNAP\r\n"
+FORMAT_VERSION = 1
+
+# Layout, little-endian, every section 8-byte aligned:
+#   header   magic, version, flags, count, created_at, section offsets
+#   domains  UTF-8 domain names, concatenated in sorted (bytewise) order
+#   index    count x (offset, length) into domains; binary-searched in place
+#   records  count x (risk_score, updated_at epoch, blob offset, blob length);
+#            scores are float32, so readers round them to 2 decimals
+#   blobs    orjson {"source_url", "summary"} per domain
+_HEADER = struct.Struct("<8sHHIdQQQQ")
+_INDEX = struct.Struct("<IH2x")
+_RECORD = struct.Struct("<fdQI")
+
+class SnapshotError(ValueError):
+    pass
+
+def _pad(f) -> int:
+    pos = f.tell()
+    f.write(b"\0" * (-pos % 8))
+    return pos + (-pos % 8)
+
+def write_snapshot(path: str, rows) -> int:
+    """Write ``(domain, source_url, summary, risk_score, updated_at_epoch)`` rows to
+    ``path``; the newest row wins for duplicate domains. Returns the domain count.
+    """
+    latest: dict[bytes, tuple] = {}
+    for domain, source_url, summary, score, updated_at in rows:
+        if score is None:
+            continue
+        key = domain.encode("utf-8")
+        if len(key) > 0xFFFF:
+            continue
+        if key not in latest or latest[key][3] < updated_at:
+            latest[key] = (source_url, summary, float(score), float(updated_at))
+    domains = sorted(latest)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+
+        domains_off = _pad(f)
+        name_offsets = []
+        for key in domains:
+            name_offsets.append(f.tell() - domains_off)
+            f.write(key)
+
+        index_off = _pad(f)
+        for key, off in zip(domains, name_offsets):
+            f.write(_INDEX.pack(off, len(key)))
+
+        records_off = _pad(f)
+        blobs = []
+        blob_pos = 0
+        for key in domains:
+            source_url, summary, score, updated_at = latest[key]
+            blob = orjson.dumps({"source_url": source_url, "summary": summary})
+            f.write(_RECORD.pack(score, updated_at, blob_pos, len(blob)))
+            blobs.append(blob)
+            blob_pos += len(blob)
+
+        blobs_off = _pad(f)
+        for blob in blobs:
+            f.write(blob)
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(domains), time.time(),
+                             domains_off, index_off, records_off, blobs_off))
+        f.flush()
+        os.fsync(f.fileno())
+    # Atomic rename: readers never map a half-written file
+    os.replace(tmp, path)
+    return len(domains)
+
+class Snapshot:
+    """Memory-mapped, read-only view of a snapshot file.
+
+    Lookups binary-search the index in place, so only the pages a lookup
+    touches are ever read; nothing is loaded up front.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) < _HEADER.size:
+            raise SnapshotError(f"{path}: not a snapshot file")
+        (magic, version, _flags, self.count, self.created_at,
+         self.domains_off, self.index_off, self.records_off, self.blobs_off) = _HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path}: not a snapshot file")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"{path}: unsupported snapshot version {version}")
+        if self.records_off + self.count * _RECORD.size > self.blobs_off or self.blobs_off > len(self.mm):
+            raise SnapshotError(f"{path}: truncated snapshot")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _domain(self, i: int) -> bytes:
+        off, length = _INDEX.unpack_from(self.mm, self.index_off + i * _INDEX.size)
+        start = self.domains_off + off
+        return self.mm[start:start + length]
+
+    def _find(self, domain: str) -> int | None:
+        key = domain.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._domain(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._domain(lo) == key:
+            return lo
+        return None
+
+    def _entry(self, i: int) -> dict:
+        score, updated_at, blob_off, blob_len = _RECORD.unpack_from(self.mm, self.records_off + i * _RECORD.size)
+        start = self.blobs_off + blob_off
+        blob = orjson.loads(self.mm[start:start + blob_len])
+        return {"risk_score": round(score, 2), "updated_at": updated_at, **blob}
+
+    def get(self, domain: str) -> dict | None:
+        """``{"risk_score", "updated_at", "source_url", "summary"}`` for ``domain``, or None."""
+        i = self._find(domain)
+        return None if i is None else self._entry(i)
+
+    def score(self, domain: str) -> tuple[float, float] | None:
+        """``(risk_score, updated_at)`` without decoding the summary blob."""
+        i = self._find(domain)
+        if i is None:
+            return None
+        score, updated_at, _, _ = _RECORD.unpack_from(self.mm, self.records_off + i * _RECORD.size)
+        return round(score, 2), updated_at
+
+    def rows(self):
+        """All entries in domain order, as written by ``write_snapshot``."""
+        for i in range(self.count):
+            entry = self._entry(i)
+            yield (self._domain(i).decode("utf-8"), entry["source_url"], entry["summary"],
+                   entry["risk_score"], entry["updated_at"])
+
+    def close(self) -> None:
+        self.mm.close()
+
+def open_snapshot(path: str = SNAPSHOT_PATH) -> Snapshot | None:
+    """Open the configured snapshot, or None if unset or unusable."""
+    if not path:
+        return None
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not open snapshot {path}: {e}")
+        return None
+    print(f"Loaded snapshot {path} ({len(snapshot)} domains)")
+    return snapshot
+
+def export_rows(conn):
+    from sqlalchemy import text
+    return conn.execute(text("""
+      SELECT domain, source_url, summary_json, risk_score, EXTRACT(EPOCH FROM updated_at) AS updated_at
+      FROM site_summary WHERE risk_score IS NOT NULL AND summary_json IS NOT NULL
+    """))
+
+def import_rows(conn, rows, batch_size: int = 1000) -> int:
+    """Upsert snapshot rows into site_summary, keeping whichever side is newer."""
+    from sqlalchemy import text
+    statement = text("""
+      INSERT INTO site_summary(domain, source_url, summary_json, risk_score, response_body, updated_at)
+      VALUES (:d, :u, CAST(:s AS JSONB), :r, NULL, to_timestamp(:t) AT TIME ZONE 'UTC')
+      ON CONFLICT (domain) DO UPDATE
+        SET source_url=EXCLUDED.source_url,
+            summary_json=EXCLUDED.summary_json,
+            risk_score=EXCLUDED.risk_score,
+            response_body=NULL,
+            updated_at=EXCLUDED.updated_at
+        WHERE site_summary.updated_at < EXCLUDED.updated_at
+    """)
+    batch = []
+    total = 0
+    for domain, source_url, summary, score, updated_at in rows:
+        batch.append({"d": domain, "u": source_url, "s": orjson.dumps(summary).decode(),
+                      "r": float(score), "t": float(updated_at)})
+        if len(batch) >= batch_size:
+            conn.execute(statement, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(statement, batch)
+        total += len(batch)
+    return total
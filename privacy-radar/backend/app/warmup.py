@@ -0,0 +1,45 @@
+import os
+import asyncio
+import time
+
+WARMUP = os.getenv("WARMUP", "1").strip() not in ("0", "false", "")
+WARMUP_DELAY = float(os.getenv("WARMUP_DELAY", "0.5"))
+
+def warm_up() -> float:
+    """Import the lazily-loaded heavy modules and run one tiny extraction so
+    lxml/readability are initialized before the first real request.
+    Returns the time spent in seconds.
+    """
+    started = time.perf_counter()
+    import httpx  # noqa: F401
+    from .extract import html_to_text
+    html_to_text("<html><body><article><p>Privacy policy warm-up.</p></article></body></html>")
+    from .risk_model import get_model
+    get_model()
+    if os.getenv("OPENAI_API_KEY", "").strip():
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            pass
+    return time.perf_counter() - started
+
+async def _warm_up_later() -> None:
+    # Let the server finish binding and answer /health before competing for the CPU
+    await asyncio.sleep(WARMUP_DELAY)
+    try:
+        elapsed = await asyncio.to_thread(warm_up)
+        print(f"Warm-up finished in {elapsed:.2f}s")
+    except Exception as e:
+        print(f"Warning: warm-up failed: {e}")
+    from . import llm_gateway
+    if llm_gateway.OLLAMA_HOST:
+        try:
+            await llm_gateway.preload_ollama()
+        except Exception as e:
+            print(f"Warning: could not preload Ollama model {llm_gateway.OLLAMA_MODEL}: {e}")
+
+def schedule_warm_up() -> asyncio.Task | None:
+    """Start the background warm-up if enabled (call from a startup hook)."""
+    if not WARMUP:
+        return None
+    return asyncio.create_task(_warm_up_later())
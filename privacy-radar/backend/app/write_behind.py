@@ -0,0 +1,213 @@
+import os
+import time
+import asyncio
+import orjson
+from dataclasses import dataclass
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from .db import engine
+from .sections import store_sections
+from .coherence import publish
+from . import deadline
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.5"))
+WRITE_BUFFER_MAX = int(os.getenv("WRITE_BUFFER_MAX", "2000"))
+# Longest a request waits for room in a full buffer before its write is dropped
+WRITE_BACKPRESSURE_TIMEOUT = float(os.getenv("WRITE_BACKPRESSURE_TIMEOUT", "2"))
+
+@dataclass
+class PendingWrite:
+    domain: str
+    source_url: str
+    summary: dict
+    risk_score: float
+    body: bytes
+    sections: list[dict]
+    expires_at: float
+    privacyspy: dict | None = None
+    queued_at: float = 0.0
+
+def _upsert(conn, batch: list[PendingWrite]) -> None:
+    """One multi-row upsert for the whole batch (domains are unique within a batch)."""
+    rows = []
+    params = {}
+    for i, w in enumerate(batch):
+        rows.append(f"(:d{i}, :u{i}, CAST(:s{i} AS JSONB), :r{i}, :b{i}, NOW())")
+        params.update({f"d{i}": w.domain, f"u{i}": w.source_url, f"s{i}": orjson.dumps(w.summary).decode(),
+                       f"r{i}": float(w.risk_score), f"b{i}": w.body})
+    conn.execute(text(f"""
+      INSERT INTO site_summary(domain, source_url, summary_json, risk_score, response_body, updated_at)
+      VALUES {", ".join(rows)}
+      ON CONFLICT (domain) DO UPDATE
+        SET source_url=EXCLUDED.source_url,
+            summary_json=EXCLUDED.summary_json,
+            risk_score=EXCLUDED.risk_score,
+            response_body=EXCLUDED.response_body,
+            updated_at=NOW()
+    """), params)
+
+def _write_batch(batch: list[PendingWrite]) -> None:
+    with engine.begin() as conn:
+        _upsert(conn, batch)
+        for w in batch:
+            if w.sections:
+                store_sections(conn, w.domain, w.sections)
+            # Delivered to every worker when this transaction commits
+            publish(conn, w.domain, w.body, privacyspy=w.privacyspy, expires_at=w.expires_at,
+                    risk_score=float(w.risk_score), updated_at=time.time())
+
+def _is_connection_error(e: Exception) -> bool:
+    # Worth retrying the whole batch later; anything else is about the rows themselves
+    return isinstance(e, (OperationalError, InterfaceError)) or getattr(e, "connection_invalidated", False)
+
+class WriteBehindBuffer:
+    """Collects site_summary writes off the response path and flushes them in
+    batches from a background task: when WRITE_BATCH_SIZE writes are waiting,
+    every WRITE_FLUSH_INTERVAL seconds otherwise, and once more on shutdown.
+
+    A newer write for a domain replaces a buffered one. When the buffer is
+    full, ``put`` waits for the next flush (backpressure). Batches that fail
+    because the database is unreachable stay buffered and are retried; rows
+    the database rejects are dropped one by one.
+    """
+
+    def __init__(self, batch_size: int, interval: float, max_size: int):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_size = max_size
+        self.pending: dict[str, PendingWrite] = {}
+        self.flushed_total = 0
+        self.batches_total = 0
+        self.failed_batches_total = 0
+        self.backpressure_waits_total = 0
+        self.dropped_total = 0
+        self.last_flush_ms: float | None = None
+        self._wake: asyncio.Event | None = None
+        self._space: asyncio.Condition | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, write: PendingWrite) -> bool:
+        """Buffer ``write``; False if it was dropped because the buffer stayed full."""
+        if self._task is None:
+            # Not started (e.g. a script importing the app): write through
+            await asyncio.to_thread(_write_batch, [write])
+            return True
+        if len(self.pending) >= self.max_size and write.domain not in self.pending:
+            self.backpressure_waits_total += 1
+            self._wake.set()
+            async with self._space:
+                try:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: len(self.pending) < self.max_size),
+                        deadline.stage_timeout(WRITE_BACKPRESSURE_TIMEOUT),
+                    )
+                except asyncio.TimeoutError:
+                    self.dropped_total += 1
+                    print(f"Warning: write buffer full, not persisting {write.domain}")
+                    return False
+        write.queued_at = time.monotonic()
+        self.pending.pop(write.domain, None)
+        self.pending[write.domain] = write
+        if len(self.pending) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    async def _run(self) -> None:
+        backoff = self.interval
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                break
+            ok = await self.flush()
+            # Back off while the database is failing instead of retrying every interval
+            backoff = self.interval if ok else min(backoff * 2, 30.0)
+
+    async def flush(self) -> bool:
+        """Write everything buffered, batch by batch. False if the database is unreachable."""
+        while self.pending:
+            batch = list(self.pending.values())[:self.batch_size]
+            for w in batch:
+                del self.pending[w.domain]
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(_write_batch, batch)
+                stored = len(batch)
+            except Exception as e:
+                self.failed_batches_total += 1
+                if _is_connection_error(e):
+                    print(f"Warning: Failed to store {len(batch)} analyses in database: {e}")
+                    self._requeue(batch)
+                    return False
+                # A row Postgres rejects (e.g. a NUL in the summary) must not hold back the
+                # rest of its batch: retry one by one and drop only the rows that still fail
+                print(f"Warning: Failed to store {len(batch)} analyses in database, retrying one at a time: {e}")
+                stored = await self._write_each(batch)
+                if stored is None:
+                    return False
+            finally:
+                async with self._space:
+                    self._space.notify_all()
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.flushed_total += stored
+            self.batches_total += 1
+        return True
+
+    async def _write_each(self, batch: list[PendingWrite]) -> int | None:
+        """Rows of ``batch`` stored one at a time; None if the connection failed meanwhile."""
+        stored = 0
+        for i, w in enumerate(batch):
+            try:
+                await asyncio.to_thread(_write_batch, [w])
+                stored += 1
+            except Exception as e:
+                if _is_connection_error(e):
+                    self._requeue(batch[i:])
+                    return None
+                self.dropped_total += 1
+                print(f"Warning: database rejected the analysis of {w.domain}, dropping it: {e}")
+        return stored
+
+    def _requeue(self, batch: list[PendingWrite]) -> None:
+        for w in batch:
+            # Keep the failed write unless a newer one for the domain arrived meanwhile
+            self.pending.setdefault(w.domain, w)
+
+    async def close(self) -> None:
+        """Stop the background task and flush what is left (call from a shutdown hook)."""
+        if self._task is None:
+            return
+        # Not cancelled: a batch already taken out of pending would be lost if its write
+        # failed, and could commit after the final flush's newer rows for the same domain
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+        if not await self.flush():
+            print(f"Warning: {len(self.pending)} analyses were not persisted at shutdown")
+
+    def stats(self) -> dict:
+        oldest = min((w.queued_at for w in self.pending.values()), default=None)
+        return {
+            "buffered": len(self.pending),
+            "oldest_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest is not None else None,
+            "flushed_total": self.flushed_total,
+            "batches_total": self.batches_total,
+            "failed_batches_total": self.failed_batches_total,
+            "backpressure_waits_total": self.backpressure_waits_total,
+            "dropped_total": self.dropped_total,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+write_buffer = WriteBehindBuffer(WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL, WRITE_BUFFER_MAX)
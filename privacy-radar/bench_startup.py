@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: time from process launch to the first healthy /health.
+
+    python3 bench_startup.py                 # free build, 5 runs
+    python3 bench_startup.py --app app.main:app --runs 10
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(app: str, timeout: float, warmup: bool) -> float:
+    port = free_port()
+    env = dict(os.environ, WARMUP="1" if warmup else "0")
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=0.5) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/health not healthy after {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-healthy-/health")
+    parser.add_argument("--app", default="app.main_free:app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--no-warmup", action="store_true", help="disable the background warm-up")
+    args = parser.parse_args()
+
+    print(f"⏱️  Startup benchmark: {args.app} ({args.runs} runs)")
+    print("=" * 50)
+    samples = []
+    for i in range(args.runs):
+        t = time_to_healthy(args.app, args.timeout, not args.no_warmup)
+        samples.append(t)
+        print(f"   run {i + 1}: {t * 1000:.0f} ms")
+
+    print("=" * 50)
+    print(f"   min {min(samples) * 1000:.0f} ms | median {statistics.median(samples) * 1000:.0f} ms"
+          f" | max {max(samples) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
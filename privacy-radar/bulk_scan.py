@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Privacy Radar Bulk Scan
+Analyze a large domain list offline, without going through the HTTP API.
+
+    python3 bulk_scan.py domains.txt results.jsonl
+    python3 bulk_scan.py domains.txt results_parquet/ --format parquet
+
+The input has one domain per line, optionally followed by whitespace-separated
+candidate policy URLs. Blank lines and lines starting with '#' are ignored.
+
+Each domain's privacy, cookie and terms pages are merged the same way
+POST /summarize merges them. Fetching runs on the event loop with bounded
+concurrency; readability extraction, heuristics and keyword scoring run in a
+process pool. Completed
+domains are appended to ``<output>.checkpoint`` once their result has been
+written, so re-running the same command after a crash resumes where it stopped.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the backend app to the path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import httpx
+
+from app.analysis import analyze_documents
+from app.extract import pick_policy_urls, fetch_html
+from app.privacyspy import enhanced_risk_score_with_privacyspy
+
+
+def read_domains(path: str) -> list[tuple[str, list[str]]]:
+    jobs = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            domain = parts[0].strip().lower()
+            if domain.startswith("www."):
+                domain = domain[4:]
+            if domain in seen:
+                continue
+            seen.add(domain)
+            jobs.append((domain, parts[1:]))
+    return jobs
+
+
+def load_checkpoint(path: str) -> set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class JsonlWriter:
+    """Appends one JSON object per line; every record is flushed before it is checkpointed."""
+
+    def __init__(self, path: str):
+        self.f = open(path, "a", encoding="utf-8")
+
+    def write(self, records: list[dict]) -> None:
+        for record in records:
+            self.f.write(json.dumps(record) + "\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class ParquetWriter:
+    """Writes each batch as a new part file in ``path`` so resumed runs never rewrite old parts."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("❌ Parquet output requires pyarrow: pip install pyarrow")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.part = len([p for p in os.listdir(path) if p.endswith(".parquet")])
+
+    def write(self, records: list[dict]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        rows = [dict(r, summary=json.dumps(r["summary"]),
+                     enhanced_insights=json.dumps(r["enhanced_insights"])) for r in records]
+        tmp = os.path.join(self.path, f".part-{self.part:05d}.parquet.tmp")
+        pq.write_table(pa.Table.from_pylist(rows), tmp)
+        # Atomic rename: a crash never leaves a half-written part behind
+        os.replace(tmp, os.path.join(self.path, f"part-{self.part:05d}.parquet"))
+        self.part += 1
+
+    def close(self) -> None:
+        pass
+
+
+async def scan_domain(domain: str, candidates: list[str], client: httpx.AsyncClient,
+                      pool: ProcessPoolExecutor, fetch_limit: asyncio.Semaphore,
+                      lookup_limit: asyncio.Semaphore) -> dict:
+    # The same privacy, cookie and terms pages /summarize merges, so scores match the API's
+    urls = pick_policy_urls(domain, candidates)
+
+    async def fetch(url: str) -> str:
+        async with fetch_limit:
+            return await fetch_html(url, client)
+
+    htmls = await asyncio.gather(*(fetch(u) for u in urls))
+    if not any(htmls):
+        # fetch_html reports timeouts and HTTP errors as "": fail so the domain isn't checkpointed
+        raise RuntimeError(f"no policy fetched for {domain} from {', '.join(urls)}")
+
+    loop = asyncio.get_running_loop()
+    analysis = await loop.run_in_executor(pool, analyze_documents, list(zip(urls, htmls)))
+
+    # The PrivacySpy lookup is an upstream call too; keep it bounded like the fetches
+    async with lookup_limit:
+        score, enhanced_insights = await enhanced_risk_score_with_privacyspy(
+            "", domain, heuristic_score=analysis["heuristic_score"], model_score=analysis["model_score"]
+        )
+    if len(analysis["documents"]) > 1:
+        enhanced_insights["documents"] = analysis["documents"]
+    return {
+        "domain": domain,
+        "source_url": analysis["documents"][0] if analysis["documents"] else urls[0],
+        "summary": analysis["summary"],
+        "risk_score": score,
+        "enhanced_insights": enhanced_insights,
+        "text_length": analysis["text_length"],
+        "scanned_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+async def run(args) -> None:
+    checkpoint_path = args.output.rstrip("/") + ".checkpoint"
+    done = load_checkpoint(checkpoint_path)
+    jobs = [j for j in read_domains(args.input) if j[0] not in done]
+
+    print(f"📋 {len(done)} domains already done, {len(jobs)} to scan")
+    if not jobs:
+        return
+
+    writer = ParquetWriter(args.output) if args.format == "parquet" else JsonlWriter(args.output)
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+
+    fetch_limit = asyncio.Semaphore(args.concurrency)
+    lookup_limit = asyncio.Semaphore(args.lookup_concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    pending: list[dict] = []
+    finished = failed = 0
+    started = time.monotonic()
+
+    def flush() -> None:
+        if not pending:
+            return
+        writer.write(pending)
+        checkpoint.write("".join(r["domain"] + "\n" for r in pending))
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+        pending.clear()
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            async with httpx.AsyncClient(follow_redirects=True, timeout=args.timeout, limits=limits) as client:
+                # Keep a bounded window of tasks in flight so 200k domains don't become 200k tasks
+                window = args.concurrency * 4
+                queue = iter(jobs)
+                in_flight: set[asyncio.Task] = set()
+
+                def refill() -> None:
+                    for domain, candidates in queue:
+                        in_flight.add(asyncio.create_task(
+                            scan_domain(domain, candidates, client, pool, fetch_limit, lookup_limit)
+                        ))
+                        if len(in_flight) >= window:
+                            break
+
+                refill()
+                while in_flight:
+                    finished_tasks, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished_tasks:
+                        in_flight.discard(task)
+                        try:
+                            pending.append(task.result())
+                            finished += 1
+                        except Exception as e:
+                            # Not checkpointed: retried on the next run
+                            failed += 1
+                            print(f"Warning: scan failed: {e}")
+                    if len(pending) >= args.batch_size:
+                        flush()
+                    refill()
+
+                    total = finished + failed
+                    if total and total % 1000 == 0:
+                        rate = total / (time.monotonic() - started)
+                        print(f"⏱️  {total}/{len(jobs)} domains ({rate:.1f}/s)")
+        flush()
+    finally:
+        writer.close()
+        checkpoint.close()
+
+    elapsed = time.monotonic() - started
+    print(f"✅ Scanned {finished} domains in {elapsed:.1f}s ({failed} failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk privacy policy scan with resumable checkpoints")
+    parser.add_argument("input", help="domain list, one domain per line")
+    parser.add_argument("output", help="JSONL file, or a directory for parquet output")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent fetches")
+    parser.add_argument("--lookup-concurrency", type=int, default=8, help="concurrent PrivacySpy lookups")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="extraction/scoring processes")
+    parser.add_argument("--batch-size", type=int, default=500, help="records per write/checkpoint")
+    parser.add_argument("--timeout", type=float, default=15.0, help="per-fetch timeout in seconds")
+    args = parser.parse_args()
+
+    print("🚀 Privacy Radar Bulk Scan")
+    print("=" * 50)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
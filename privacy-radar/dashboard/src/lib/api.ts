@@ -120,8 +120,22 @@ async function localHeuristicSummarize(domain: string, candidateUrls: string[])
   return { domain, source_url: picked, summary, risk_score };
 }
 
+async function getStoredSite(domain: string) {
+  // Cacheable GET: served by the browser/CDN cache or revalidated with a 304
+  try {
+    const res = await fetch(`${API}/site/${encodeURIComponent(domain)}`);
+    if (res.ok) return await res.json();
+  } catch { /* fall through to a full analysis */ }
+  return null;
+}
+
 export async function getSite(domain: string) {
   console.log(`[Privacy Radar] Starting analysis for: ${domain}`);
+  const stored = await getStoredSite(domain);
+  if (stored && stored.enhanced_insights?.fresh !== false) {
+    console.log(`[Privacy Radar] Stored analysis:`, stored);
+    return stored;
+  }
   try {
     const res = await fetch(`${API}/summarize`, {
       method: "POST",
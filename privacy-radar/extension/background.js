@@ -1,9 +1,35 @@
+importScripts("api.js");
+
 function setBadge(score) {
   const s = Math.max(0, Math.min(99, Math.round(score)));
   const color = s <= 30 ? "#34a853" : s <= 60 ? "#fbbc05" : "#ea4335";
   chrome.action.setBadgeText({ text: String(s) });
   chrome.action.setBadgeBackgroundColor({ color });
 }
+
+// Badge from the compact score lookup; never triggers a full analysis
+async function refreshBadge(tab) {
+  if (!tab || !tab.url || !/^https?:/.test(tab.url)) return;
+  const domain = new URL(tab.url).hostname;
+  try {
+    const apiUrl = await detectBestAPI();
+    const r = await fetch(`${apiUrl}/scores?domains=${encodeURIComponent(domain)}`);
+    if (!r.ok) return;
+    const { scores } = await r.json();
+    const hit = scores[domain];
+    if (hit) setBadge(hit.risk_score);
+    else chrome.action.setBadgeText({ text: "" });
+  } catch (e) {
+    // Backend not running: leave the badge alone
+  }
+}
+
 chrome.runtime.onMessage.addListener((msg) => {
   if (msg.type === "SET_BADGE") setBadge(msg.score);
 });
+chrome.tabs.onActivated.addListener(({ tabId }) => {
+  chrome.tabs.get(tabId, refreshBadge);
+});
+chrome.tabs.onUpdated.addListener((tabId, info, tab) => {
+  if (info.status === "complete" && tab.active) refreshBadge(tab);
+});
@@ -1,28 +1,3 @@
-const API_ENDPOINTS = {
-  cloud: "https://privacy-radar-api.railway.app",
-  local: "http://localhost:8000",
-  none: null
-};
-
-async function detectBestAPI() {
-  console.log("Checking local API...");
-  
-  try {
-    const response = await fetch(`${API_ENDPOINTS.local}/health`, { 
-      method: 'GET',
-      timeout: 2000 
-    });
-    if (response.ok) {
-      console.log("Using local API");
-      return API_ENDPOINTS.local;
-    }
-  } catch (e) {
-    console.log("Local API not available:", e.message);
-  }
-  
-  throw new Error("Privacy Radar API is not available. Please ensure the backend is running: python3 start_free.py");
-}
-
 async function summarize(domain, links) {
   const apiUrl = await detectBestAPI();
   
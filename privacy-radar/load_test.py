@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Privacy Radar Load Test
+Drive /summarize at increasing concurrency against local mock origins and
+report throughput, latency percentiles and where the service saturates.
+
+    python3 load_test.py                                  # main_free only
+    DATABASE_URL=postgresql+psycopg://... python3 load_test.py --app both
+    python3 load_test.py --concurrency 1,4,16,64 --step-seconds 30 --json results.json
+
+Everything the backend talks to is replaced by one local mock server:
+
+* origins at ``/origin/<profile>/<domain>/privacy-policy``, passed to the
+  backend as ``candidate_urls``; each profile has its own latency, page size
+  and error rate (see ORIGIN_PROFILES, mixed with --origin-mix)
+* PrivacySpy at ``/privacyspy`` (PRIVACYSPY_BASE_URL), knowing --privacyspy-ratio
+  of the domains
+* an Ollama-compatible LLM at ``/llm`` (OLLAMA_HOST) that serves
+  --llm-concurrency requests at a time, like a local model does
+
+Requests mix a small set of hot domains (primed before measuring, so
+``main`` serves them from cache) with never-seen cold domains. ``main`` needs
+a Postgres DATABASE_URL; ``main_free`` has no cache, so there every request
+is a full analysis.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import zlib
+from multiprocessing import Process
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+# name: (mean latency in seconds, page bytes, error rate)
+ORIGIN_PROFILES = {
+    "fast": (0.05, 20_000, 0.0),
+    "slow": (2.0, 60_000, 0.0),
+    "huge": (0.3, 1_500_000, 0.0),
+    "flaky": (0.2, 30_000, 0.25),
+}
+
+POLICY_HEADINGS = [
+    "Information We Collect", "How We Use Your Information", "Sharing and Disclosure",
+    "Data Retention", "Your Rights and Choices", "Cookies and Tracking", "Security",
+    "Children's Privacy", "Changes to This Policy", "Contact Us",
+]
+
+POLICY_SENTENCES = [
+    "We collect your name, email address and phone number when you create an account.",
+    "We may collect location data and device identifiers such as IP address and browser type.",
+    "We use cookies and similar tracking technologies to personalize advertising.",
+    "We share information with advertising partners and analytics providers.",
+    "We do not sell your personal information.",
+    "We may sell or share personal information with third parties for targeted advertising.",
+    "We retain personal data for as long as necessary to provide the services.",
+    "You can request access to, correction of, or deletion of your personal data.",
+    "You may opt out of marketing communications at any time.",
+    "We use industry-standard encryption to protect your information.",
+    "We process payment information through our payment processors.",
+    "Biometric information is never collected.",
+    "We may combine information from third-party sources with information we collect.",
+    "Data may be transferred to and processed in countries other than your own.",
+    "Residents of California have additional rights under the CCPA.",
+    "Under the GDPR you may lodge a complaint with a supervisory authority.",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def policy_html(domain: str, size: int) -> str:
+    """A deterministic, roughly ``size``-byte policy page for ``domain``."""
+    rng = random.Random(zlib.crc32(domain.encode()))
+    parts = [f"<html><head><title>{domain} Privacy Policy</title></head><body><article>",
+             f"<h1>{domain} Privacy Policy</h1>"]
+    length = 0
+    while length < size:
+        for heading in POLICY_HEADINGS:
+            parts.append(f"<h2>{heading}</h2>")
+            for _ in range(rng.randint(2, 6)):
+                sentences = " ".join(rng.choice(POLICY_SENTENCES) for _ in range(rng.randint(3, 8)))
+                parts.append(f"<p>{sentences}</p>")
+                length += len(sentences) + 7
+            if length >= size:
+                break
+    parts.append("</article></body></html>")
+    return "".join(parts)
+
+
+def privacyspy_product(domain: str) -> dict:
+    rng = random.Random(zlib.crc32(domain.encode()))
+    return {
+        "name": domain,
+        "hostnames": [domain],
+        "score": round(rng.uniform(0, 10), 1),
+        "rubric": [],
+    }
+
+
+def build_mock_app(latency_scale: float, privacyspy_ratio: float, llm_latency: float,
+                   llm_concurrency: int):
+    from fastapi import FastAPI, Request, Response
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI()
+    llm_slots: dict[str, asyncio.Semaphore] = {}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    @app.get("/origin/{profile}/{domain}/privacy-policy")
+    async def origin(profile: str, domain: str):
+        latency, size, error_rate = ORIGIN_PROFILES.get(profile, ORIGIN_PROFILES["fast"])
+        await asyncio.sleep(random.uniform(0.5, 1.5) * latency * latency_scale)
+        if random.random() < error_rate:
+            return Response("upstream error", status_code=random.choice([500, 502, 503]))
+        return Response(policy_html(domain, size), media_type="text/html")
+
+    @app.get("/privacyspy/products/{domain}")
+    async def privacyspy(domain: str):
+        await asyncio.sleep(random.uniform(0.02, 0.1) * latency_scale)
+        if zlib.crc32(domain.encode()) % 1000 >= privacyspy_ratio * 1000:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        return privacyspy_product(domain)
+
+    @app.post("/llm/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        prompt = body.get("prompt", "")
+        # Semaphore is created lazily so it binds to the server's event loop
+        slots = llm_slots.setdefault("slots", asyncio.Semaphore(llm_concurrency))
+        async with slots:
+            # Longer prompts take longer, as they would on a real model
+            await asyncio.sleep(llm_latency * (0.5 + min(len(prompt), 120_000) / 120_000))
+        if "only a number" in prompt:
+            return {"model": body.get("model"), "response": str(random.randint(10, 90)), "done": True}
+        summary = {
+            "data_collected": ["email", "location"],
+            "purposes": ["advertising", "analytics"],
+            "sharing": "shared with partners",
+            "retention": "as long as necessary",
+            "user_rights": "access, deletion",
+        }
+        if "[Section " in prompt:
+            # main's per-section prompt numbers each section and expects findings keyed by number
+            numbers = re.findall(r"^\[Section (\d+)\]", prompt, re.M)
+            summary = {"sections": {n: summary for n in numbers}}
+        return {"model": body.get("model"), "response": json.dumps(summary), "done": True}
+
+    return app
+
+
+def serve_mocks(port: int, args) -> None:
+    import uvicorn
+    app = build_mock_app(args.latency_scale, args.privacyspy_ratio, args.llm_latency,
+                         args.llm_concurrency)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_healthy(url: str, proc, timeout: float = 60.0) -> None:
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"{url} not healthy after {timeout}s")
+
+
+def parse_mix(spec: str) -> tuple[list[str], list[float]]:
+    names, weights = [], []
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ORIGIN_PROFILES:
+            sys.exit(f"❌ Unknown origin profile '{name}' (known: {', '.join(ORIGIN_PROFILES)})")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+class Workload:
+    """Hot domains (Zipf-weighted, primed up front) mixed with never-seen cold domains."""
+
+    def __init__(self, mock_url: str, hot_domains: int, hot_ratio: float, mix: str):
+        self.mock_url = mock_url
+        self.hot_ratio = hot_ratio
+        self.run_id = f"{int(time.time()):x}"
+        self.hot = [f"hot{i}-{self.run_id}.example" for i in range(hot_domains)]
+        self.hot_weights = [1 / (i + 1) for i in range(hot_domains)]
+        self.profiles, self.profile_weights = parse_mix(mix)
+        self.cold_seq = 0
+
+    def profile_for(self, domain: str) -> str:
+        # Stable per domain, so a hot domain always comes from the same kind of origin
+        rng = random.Random(zlib.crc32(domain.encode()))
+        return rng.choices(self.profiles, self.profile_weights)[0]
+
+    def request(self, domain: str) -> dict:
+        url = f"{self.mock_url}/origin/{self.profile_for(domain)}/{domain}/privacy-policy"
+        return {"domain": domain, "candidate_urls": [url]}
+
+    def next(self) -> tuple[str, dict]:
+        if self.hot and random.random() < self.hot_ratio:
+            return "hot", self.request(random.choices(self.hot, self.hot_weights)[0])
+        self.cold_seq += 1
+        return "cold", self.request(f"cold{self.cold_seq}-{self.run_id}.example")
+
+
+def percentile(samples: list[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def run_step(client, app_url: str, workload: Workload, concurrency: int,
+                   seconds: float) -> dict:
+    latencies = {"hot": [], "cold": []}
+    statuses: dict[str, int] = {}
+    stop_at = time.monotonic() + seconds
+
+    async def worker() -> None:
+        while time.monotonic() < stop_at:
+            kind, body = workload.next()
+            started = time.perf_counter()
+            try:
+                r = await client.post(f"{app_url}/summarize", json=body)
+                status = str(r.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies[kind].append(elapsed)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.monotonic() - started
+
+    ok = latencies["hot"] + latencies["cold"]
+    total = sum(statuses.values())
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput": len(ok) / wall,
+        "error_rate": (total - len(ok)) / total if total else 0.0,
+        "statuses": statuses,
+        "p50": percentile(ok, 50),
+        "p90": percentile(ok, 90),
+        "p99": percentile(ok, 99),
+        "hot_p50": percentile(latencies["hot"], 50),
+        "cold_p50": percentile(latencies["cold"], 50),
+    }
+
+
+def find_saturation(steps: list[dict], min_gain: float, max_error_rate: float) -> dict | None:
+    """Last step before throughput stops growing by ``min_gain`` or errors pass ``max_error_rate``."""
+    for prev, step in zip(steps, steps[1:]):
+        if step["throughput"] < prev["throughput"] * (1 + min_gain) or step["error_rate"] > max_error_rate:
+            return prev
+    return None
+
+
+async def drive(app_url: str, workload: Workload, args) -> list[dict]:
+    import httpx
+    max_conc = max(args.concurrency)
+    limits = httpx.Limits(max_connections=max_conc, max_keepalive_connections=max_conc)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        if workload.hot:
+            print(f"🔥 Priming {len(workload.hot)} hot domains...")
+            sem = asyncio.Semaphore(8)
+
+            async def prime(domain: str) -> None:
+                async with sem:
+                    try:
+                        await client.post(f"{app_url}/summarize", json=workload.request(domain))
+                    except Exception as e:
+                        print(f"Warning: priming {domain} failed: {e}")
+
+            await asyncio.gather(*(prime(d) for d in workload.hot))
+
+        steps = []
+        for concurrency in args.concurrency:
+            step = await run_step(client, app_url, workload, concurrency, args.step_seconds)
+            steps.append(step)
+            errors = ", ".join(f"{k}×{v}" for k, v in sorted(step["statuses"].items()) if k != "200")
+            print(f"   c={concurrency:<4} {step['throughput']:7.1f} req/s | p50 {step['p50'] * 1000:6.0f} ms"
+                  f" | p90 {step['p90'] * 1000:6.0f} ms | p99 {step['p99'] * 1000:6.0f} ms"
+                  f" | hot p50 {step['hot_p50'] * 1000:5.0f} ms | cold p50 {step['cold_p50'] * 1000:6.0f} ms"
+                  f" | errors {step['error_rate'] * 100:4.1f}%" + (f" ({errors})" if errors else ""))
+        return steps
+
+
+def run_app(app: str, mock_url: str, args) -> list[dict]:
+    port = free_port()
+    env = dict(os.environ,
+               PRIVACYSPY_BASE_URL=f"{mock_url}/privacyspy",
+               OLLAMA_HOST="" if args.no_llm else f"{mock_url}/llm",
+               OPENAI_API_KEY="")
+    cmd = [sys.executable, "-m", "uvicorn", f"app.{app}:app", "--host", "127.0.0.1",
+           "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL if args.quiet else None,
+                            stderr=subprocess.DEVNULL if args.quiet else None)
+    try:
+        app_url = f"http://127.0.0.1:{port}"
+        wait_healthy(f"{app_url}/health", proc)
+        hot = args.hot_domains if app == "main" else 0
+        workload = Workload(mock_url, hot, args.hot_ratio if hot else 0.0, args.origin_mix)
+        return asyncio.run(drive(app_url, workload, args))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /summarize against mock origins, PrivacySpy and LLM")
+    parser.add_argument("--app", choices=["main", "main_free", "both"], default="main_free")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32,64",
+                        help="comma-separated concurrency steps")
+    parser.add_argument("--step-seconds", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app under test")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request")
+    parser.add_argument("--hot-domains", type=int, default=50, help="hot domain set size (main only)")
+    parser.add_argument("--hot-ratio", type=float, default=0.8, help="share of requests for hot domains")
+    parser.add_argument("--origin-mix", default="fast=60,slow=20,huge=10,flaky=10",
+                        help=f"weighted origin profiles ({', '.join(ORIGIN_PROFILES)})")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply all origin latencies")
+    parser.add_argument("--privacyspy-ratio", type=float, default=0.3, help="share of domains PrivacySpy knows")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="mock LLM seconds per call")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="calls the mock LLM serves at once")
+    parser.add_argument("--no-llm", action="store_true", help="run the apps without an LLM")
+    parser.add_argument("--min-gain", type=float, default=0.1,
+                        help="throughput gain below which a step counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--json", help="write all step results to this file")
+    parser.add_argument("--quiet", action="store_true", help="hide the app's own output")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+
+    apps = ["main", "main_free"] if args.app == "both" else [args.app]
+    if "main" in apps and not os.getenv("DATABASE_URL"):
+        print("Warning: main needs DATABASE_URL (Postgres); skipping it")
+        apps.remove("main")
+    if not apps:
+        return
+
+    print("🚀 Privacy Radar Load Test")
+    print("=" * 50)
+    mock_port = free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    mocks = Process(target=serve_mocks, args=(mock_port, args), daemon=True)
+    mocks.start()
+    results = {}
+    try:
+        wait_healthy(f"{mock_url}/health", None)
+        for app in apps:
+            print(f"\n📊 {app} ({args.workers} worker(s), {args.step_seconds:.0f}s per step)")
+            steps = run_app(app, mock_url, args)
+            knee = find_saturation(steps, args.min_gain, args.max_error_rate)
+            results[app] = {"steps": steps, "saturation": knee}
+            peak = max(steps, key=lambda s: s["throughput"])
+            print(f"   peak {peak['throughput']:.1f} req/s at c={peak['concurrency']}")
+            if knee:
+                print(f"   ⚠️  saturates at c={knee['concurrency']} ({knee['throughput']:.1f} req/s,"
+                      f" p99 {knee['p99'] * 1000:.0f} ms)")
+            else:
+                print("   ✅ no saturation within the tested concurrency range")
+    finally:
+        mocks.terminate()
+        mocks.join()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
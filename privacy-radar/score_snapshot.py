@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Export and import precomputed score snapshots.
+
+    # From a DB deployment (DATABASE_URL), or from bulk_scan.py output
+    python3 score_snapshot.py export scores.snap
+    python3 score_snapshot.py export scores.snap --from-jsonl results.jsonl
+    # Seed another DB deployment's site_summary
+    python3 score_snapshot.py import scores.snap
+    # Check a file
+    python3 score_snapshot.py inspect scores.snap --domain example.com
+
+The free build serves a snapshot read-only when started with SNAPSHOT_PATH
+pointing at it.
+"""
+
+import argparse
+import calendar
+import json
+import os
+import sys
+import time
+
+# Add the backend app to the path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.snapshot import Snapshot, write_snapshot
+
+
+def jsonl_rows(paths: list[str]):
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                scanned = record.get("scanned_at")
+                updated_at = (calendar.timegm(time.strptime(scanned, "%Y-%m-%dT%H:%M:%SZ"))
+                              if scanned else os.path.getmtime(path))
+                yield (record["domain"], record["source_url"], record["summary"],
+                       record.get("risk_score"), updated_at)
+
+
+def export(args) -> None:
+    if args.from_jsonl:
+        rows = jsonl_rows(args.from_jsonl)
+        count = write_snapshot(args.snapshot, rows)
+    else:
+        from app.db import engine
+        from app.snapshot import export_rows
+        with engine.connect() as conn:
+            count = write_snapshot(args.snapshot, (tuple(r) for r in export_rows(conn)))
+    size = os.path.getsize(args.snapshot)
+    print(f"✅ Wrote {count} domains to {args.snapshot} ({size / 1024 / 1024:.1f} MB)")
+
+
+def import_(args) -> None:
+    from app.db import engine, init_db
+    from app.snapshot import import_rows
+    from app.coherence import publish_resync
+
+    snapshot = Snapshot(args.snapshot)
+    init_db()
+    with engine.begin() as conn:
+        count = import_rows(conn, snapshot.rows(), batch_size=args.batch_size)
+        # Running workers reload their score tables and drop cached bodies on commit
+        publish_resync(conn)
+    snapshot.close()
+    print(f"✅ Imported {count} domains from {args.snapshot} (rows newer in the DB were kept)")
+
+
+def inspect(args) -> None:
+    snapshot = Snapshot(args.snapshot)
+    created = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(snapshot.created_at))
+    print(f"📦 {args.snapshot}: {len(snapshot)} domains, created {created}")
+    for domain in args.domain or []:
+        entry = snapshot.get(domain)
+        print(f"   {domain}: {json.dumps(entry) if entry else 'not found'}")
+    snapshot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/import precomputed score snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="write site_summary (or bulk scan results) to a snapshot")
+    p.add_argument("snapshot")
+    p.add_argument("--from-jsonl", nargs="+", help="bulk_scan.py JSONL output instead of the database")
+
+    p = sub.add_parser("import", help="upsert a snapshot into site_summary")
+    p.add_argument("snapshot")
+    p.add_argument("--batch-size", type=int, default=1000)
+
+    p = sub.add_parser("inspect", help="print snapshot metadata and look up domains")
+    p.add_argument("snapshot")
+    p.add_argument("--domain", action="append", help="domain to look up (repeatable)")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args)
+    elif args.command == "import":
+        import_(args)
+    else:
+        inspect(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -43,12 +43,13 @@ def main():
     print("❤️  Health: http://localhost:8000/health")
     print("\nPress Ctrl+C to stop")
     
-    # Start the server
+    # Start the server. The reloader adds a supervisor process and file watching
+    # to every cold start, so it is opt-in (RELOAD=1) for development.
     uvicorn.run(
         "app.main_free:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=os.getenv("RELOAD", "0") == "1",
         log_level="info"
     )
 
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Train the local risk model against PrivacySpy ratings.
+
+    # 1. Build a corpus of (policy text, PrivacySpy score) pairs
+    python3 train_risk_model.py build-corpus domains.txt corpus.jsonl
+    # 2. Fit the hashed n-gram linear model and save it where the backend loads it
+    python3 train_risk_model.py train corpus.jsonl --out backend/app/risk_model.npz
+    # 3. Bulk rescoring of any JSONL with a "text" field
+    python3 train_risk_model.py score texts.jsonl scored.jsonl
+
+The corpus is JSONL with {"domain", "source_url", "privacyspy_score", "text"}.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+
+# Add the backend app to the path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from app.risk_model import RiskModel, privacyspy_to_risk, RISK_MODEL_PATH
+
+
+async def build_corpus(args) -> None:
+    from app.extract import pick_best_url, fetch_text
+    from app.privacyspy import get_privacyspy_data
+
+    with open(args.domains, encoding="utf-8") as f:
+        domains = [line.split()[0].lower() for line in f if line.strip() and not line.startswith("#")]
+
+    limit = asyncio.Semaphore(args.concurrency)
+    written = 0
+
+    async def one(domain: str):
+        async with limit:
+            product = await get_privacyspy_data(domain)
+            if not product or product.get("score") is None:
+                return None
+            src = pick_best_url(domain, product.get("sources") or [])
+            _, text = await fetch_text(src)
+            if len(text) < args.min_chars:
+                return None
+            return {"domain": domain, "source_url": src,
+                    "privacyspy_score": product["score"], "text": text}
+
+    with open(args.out, "w", encoding="utf-8") as out:
+        for coro in asyncio.as_completed([one(d) for d in domains]):
+            row = await coro
+            if row:
+                out.write(json.dumps(row) + "\n")
+                written += 1
+    print(f"✅ Wrote {written} of {len(domains)} domains to {args.out}")
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def train(args) -> None:
+    import numpy as np
+    from app.scoring import risk_score
+
+    rows = load_corpus(args.corpus)
+    if len(rows) < 10:
+        sys.exit(f"❌ Need at least 10 corpus rows, got {len(rows)}")
+    random.Random(args.seed).shuffle(rows)
+    texts = [r["text"] for r in rows]
+    targets = np.array([privacyspy_to_risk(r["privacyspy_score"]) for r in rows])
+
+    # Hold-out evaluation against the keyword heuristic before fitting on everything
+    split = max(1, int(len(rows) * args.holdout))
+    model = RiskModel.fit(texts[split:], targets[split:], n_features=2 ** args.bits,
+                          ngram=args.ngram, alpha=args.alpha)
+    pred = model.score_batch(texts[:split])
+    heuristic = np.array([risk_score(t) for t in texts[:split]])
+    model_mae = float(np.abs(pred - targets[:split]).mean())
+    heuristic_mae = float(np.abs(heuristic - targets[:split]).mean())
+    print(f"📊 Hold-out MAE on {split} policies: model {model_mae:.1f} | keyword heuristic {heuristic_mae:.1f}")
+
+    model = RiskModel.fit(texts, targets, n_features=2 ** args.bits, ngram=args.ngram, alpha=args.alpha)
+    model.meta.update({"holdout_mae": model_mae, "heuristic_holdout_mae": heuristic_mae})
+    model.save(args.out)
+    print(f"✅ Saved model ({len(rows)} policies, 2^{args.bits} features) to {args.out}")
+
+
+def score(args) -> None:
+    model = RiskModel.load(args.model)
+    with open(args.input, encoding="utf-8") as f, open(args.out, "w", encoding="utf-8") as out:
+        batch: list[dict] = []
+
+        def flush():
+            for row, s in zip(batch, model.score_batch([r.get("text", "") for r in batch])):
+                row = {k: v for k, v in row.items() if k != "text"}
+                row["model_score"] = float(s)
+                out.write(json.dumps(row) + "\n")
+            batch.clear()
+
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+                if len(batch) >= args.batch_size:
+                    flush()
+        flush()
+    print(f"✅ Scored {args.input} -> {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and apply the local risk model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build-corpus", help="fetch policies and PrivacySpy scores for a domain list")
+    p.add_argument("domains")
+    p.add_argument("out")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--min-chars", type=int, default=500, help="skip policies with less extracted text")
+
+    p = sub.add_parser("train", help="fit the model on a corpus")
+    p.add_argument("corpus")
+    p.add_argument("--out", default=RISK_MODEL_PATH)
+    p.add_argument("--bits", type=int, default=17, help="log2 of the hashed feature count")
+    p.add_argument("--ngram", type=int, default=2)
+    p.add_argument("--alpha", type=float, default=1.0, help="ridge regularization")
+    p.add_argument("--holdout", type=float, default=0.2)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("score", help="batch-score a JSONL file with a 'text' field")
+    p.add_argument("input")
+    p.add_argument("out")
+    p.add_argument("--model", default=RISK_MODEL_PATH)
+    p.add_argument("--batch-size", type=int, default=256)
+
+    args = parser.parse_args()
+    if args.command == "build-corpus":
+        asyncio.run(build_corpus(args))
+    elif args.command == "train":
+        train(args)
+    else:
+        score(args)
+
+
+if __name__ == "__main__":
+    main()